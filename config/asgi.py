@@ -1,7 +1,33 @@
 import os
 
+from asgiref.wsgi import WsgiToAsgi
+from django.conf import settings
 from django.core.asgi import get_asgi_application
+from whitenoise import WhiteNoise
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+
+def static_not_found(environ, start_response):
+    start_response("404 Not Found", [("Content-Type", "text/plain")])
+    return [b"Not Found"]
+
+
+# WhiteNoise's middleware is synchronous, so under ASGI it serves the
+# collected files in front of Django. Manifest names are hashed and never change.
+static_application = WsgiToAsgi(
+    WhiteNoise(
+        static_not_found,
+        root=settings.STATIC_ROOT,
+        prefix=settings.STATIC_URL,
+        immutable_file_test=r"^.+\.[0-9a-f]{12}\..+$",
+    )
+)
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "http" and scope["path"].startswith(settings.STATIC_URL):
+        return await static_application(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -0,0 +1,120 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+PRIMARY = "default"
+REPLICA = "replica"
+REPLICA_APPS = {"events", "users"}
+PIN_KEY = "db:primary:user:{user_id}"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# True while the current request must read from the primary.
+use_primary = ContextVar("use_primary", default=False)
+
+
+def replica_enabled():
+    return REPLICA in settings.DATABASES
+
+
+@contextmanager
+def primary():
+    token = use_primary.set(True)
+    try:
+        yield
+    finally:
+        use_primary.reset(token)
+
+
+def pin_user(user_id):
+    """
+    Send the user's reads to the primary for the rest of this request and
+    for DB_REPLICA_STICKY_SECONDS after it, so they read their own writes.
+    """
+    if replica_enabled():
+        use_primary.set(True)
+        key = PIN_KEY.format(user_id=user_id)
+        cache.set(key, 1, settings.DB_REPLICA_STICKY_SECONDS)
+
+
+def apply_user_pin(user_id):
+    if replica_enabled() and cache.get(PIN_KEY.format(user_id=user_id)):
+        use_primary.set(True)
+
+
+class PrimaryReplicaRouter:
+    """
+    Reads of the events and users apps go to the replica unless the request
+    wrote something, is inside a transaction or the user is pinned.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (
+            model._meta.app_label in REPLICA_APPS
+            and replica_enabled()
+            and not use_primary.get()
+            and not connections[PRIMARY].in_atomic_block
+        ):
+            return REPLICA
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        use_primary.set(True)
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return {obj1._state.db, obj2._state.db} <= {PRIMARY, REPLICA}
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == PRIMARY
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Starts every request on the replica, or on the primary for unsafe
+    methods, and drops whatever the request switched to when it ends.
+    A user who sent an unsafe request stays pinned to the primary.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        unsafe = request.method not in SAFE_METHODS
+        token = use_primary.set(unsafe)
+        try:
+            response = self.get_response(request)
+            if unsafe:
+                self.pin(request)
+            return response
+        finally:
+            use_primary.reset(token)
+
+    async def __acall__(self, request):
+        unsafe = request.method not in SAFE_METHODS
+        token = use_primary.set(unsafe)
+        try:
+            response = await self.get_response(request)
+            if unsafe:
+                # request.user may still be lazy and load the session.
+                await sync_to_async(self.pin)(request)
+            return response
+        finally:
+            use_primary.reset(token)
+
+    def pin(self, request):
+        # DRF sets the authenticated user on the underlying request too.
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            pin_user(user.pk)
@@ -0,0 +1,12 @@
+from functools import lru_cache
+
+import redis
+from django.conf import settings
+
+
+@lru_cache(maxsize=1)
+def get_redis_client():
+    redis_url = getattr(settings, "REDIS_URL", None)
+    if not redis_url:
+        return None
+    return redis.Redis.from_url(redis_url)
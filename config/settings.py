@@ -1,12 +1,15 @@
 from pathlib import Path
+import copy
 import os
 from datetime import timedelta
 from dotenv import load_dotenv
 import sentry_sdk
+from django.core.exceptions import ImproperlyConfigured
 
 sentry_sdk.init(
     dsn="https://bf933a02b3853f6181a05b2ff6df95d5@o4507503966158848.ingest.de.sentry.io/4509457639669840",
     send_default_pii=True,
+    traces_sample_rate=float(os.getenv("SENTRY_TRACES_SAMPLE_RATE") or 0),
 )
 
 load_dotenv()
@@ -29,9 +32,11 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     "django.contrib.sites",
+    "django.contrib.postgres",
     "django_ckeditor_5",
     "events.apps.EventsConfig",
     "users.apps.UsersConfig",
+    "monitoring.apps.MonitoringConfig",
     "rest_framework",
     "rest_framework.authtoken",
     "allauth",
@@ -43,6 +48,8 @@ INSTALLED_APPS = [
 SITE_ID = 1
 
 MIDDLEWARE = [
+    "monitoring.middleware.MetricsMiddleware",
+    "monitoring.profiling.ProfilingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -53,6 +60,7 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "allauth.account.middleware.AccountMiddleware",
+    "config.db_router.ReplicaRoutingMiddleware",
 ]
 
 ROOT_URLCONF = "config.urls"
@@ -74,6 +82,14 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "config.wsgi.application"
 
+# "wsgi" or "asgi", must match how entrypoint.sh starts gunicorn.
+SERVER_MODE = (os.getenv("SERVER_MODE") or "wsgi").lower()
+
+if SERVER_MODE == "asgi":
+    # Synchronous middleware costs every request a thread hop under ASGI,
+    # config/asgi.py serves the static files instead.
+    MIDDLEWARE.remove("whitenoise.middleware.WhiteNoiseMiddleware")
+
 
 DATABASES = {
     "default": {
@@ -83,9 +99,121 @@ DATABASES = {
         "PASSWORD": os.getenv("DB_PASSWORD"),
         "HOST": os.getenv("DB_HOST"),
         "PORT": os.getenv("DB_PORT"),
+        # Persistent connections, checked before reuse. Ignored when pooling.
+        # Under ASGI every request runs in a thread of its own, whose
+        # connection would never be reused and stay open, so none persist.
+        "CONN_MAX_AGE": (
+            0 if SERVER_MODE == "asgi" else int(os.getenv("DB_CONN_MAX_AGE") or 60)
+        ),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {},
     }
 }
 
+# psycopg 3 connection pool, one per worker process. CONN_HEALTH_CHECKS
+# makes the pool check connections before handing them out. On by default
+# under ASGI, where it is the only way to reuse connections.
+DB_POOL = (
+    os.getenv("DB_POOL") or ("true" if SERVER_MODE == "asgi" else "false")
+).lower() == "true"
+if DB_POOL:
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+    DATABASES["default"]["OPTIONS"]["pool"] = {
+        "min_size": int(os.getenv("DB_POOL_MIN_SIZE") or 2),
+        "max_size": int(os.getenv("DB_POOL_MAX_SIZE") or 10),
+        "timeout": int(os.getenv("DB_POOL_TIMEOUT") or 10),
+        "max_idle": int(os.getenv("DB_POOL_MAX_IDLE") or 300),
+    }
+
+# Behind pgbouncer in transaction pooling mode a session can't hold named
+# cursors or prepared statements across transactions.
+if (os.getenv("DB_PGBOUNCER") or "false").lower() == "true":
+    DATABASES["default"]["DISABLE_SERVER_SIDE_CURSORS"] = True
+    DATABASES["default"]["OPTIONS"]["prepare_threshold"] = None
+
+# Read replica for the events and users apps, see config/db_router.py.
+if os.getenv("DB_REPLICA_HOST") or os.getenv("DB_REPLICA_NAME"):
+    DATABASES["replica"] = copy.deepcopy(DATABASES["default"])
+    DATABASES["replica"].update(
+        {
+            "NAME": os.getenv("DB_REPLICA_NAME") or DATABASES["default"]["NAME"],
+            "USER": os.getenv("DB_REPLICA_USER") or DATABASES["default"]["USER"],
+            "PASSWORD": os.getenv(
+                "DB_REPLICA_PASSWORD", DATABASES["default"]["PASSWORD"]
+            ),
+            "HOST": os.getenv("DB_REPLICA_HOST") or DATABASES["default"]["HOST"],
+            "PORT": os.getenv("DB_REPLICA_PORT") or DATABASES["default"]["PORT"],
+            "TEST": {"MIRROR": "default"},
+        }
+    )
+
+DATABASE_ROUTERS = ["config.db_router.PrimaryReplicaRouter"]
+DB_REPLICA_STICKY_SECONDS = int(os.getenv("DB_REPLICA_STICKY_SECONDS") or 10)
+
+REDIS_URL = os.getenv("REDIS_URL")
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": REDIS_URL,
+            "OPTIONS": {"CLIENT_CLASS": "django_redis.client.DefaultClient"},
+        }
+    }
+else:
+    CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+
+# The read-your-writes pin of config/db_router.py is kept in the cache. In
+# a per-process cache the other workers never see it and serve the replica.
+if "replica" in DATABASES and not REDIS_URL:
+    raise ImproperlyConfigured("A read replica (DB_REPLICA_*) requires REDIS_URL.")
+
+# A local memory cache is per process and can't be invalidated across
+# workers, so list pages are only cached by default when Redis is set up.
+EVENTS_LIST_CACHE_TIMEOUT = int(
+    os.getenv("EVENTS_LIST_CACHE_TIMEOUT") or (60 if REDIS_URL else 0)
+)
+# ETag/Last-Modified come from versions kept in the cache; for the same
+# reason they are only sent when the cache is shared between workers.
+EVENTS_CONDITIONAL_REQUESTS = (
+    os.getenv("EVENTS_CONDITIONAL_REQUESTS") or ("true" if REDIS_URL else "false")
+).lower() == "true"
+
+EVENT_CACHE_TIMEOUT = int(os.getenv("EVENT_CACHE_TIMEOUT") or 60 * 5)
+EVENT_CACHE_LOCAL_TIMEOUT = int(os.getenv("EVENT_CACHE_LOCAL_TIMEOUT") or 5)
+EVENT_CACHE_LOCAL_SIZE = int(os.getenv("EVENT_CACHE_LOCAL_SIZE") or 1000)
+
+USER_CACHE_TIMEOUT = int(
+    os.getenv("USER_CACHE_TIMEOUT") or (60 * 5 if REDIS_URL else 0)
+)
+USER_CACHE_LOCAL_TIMEOUT = int(os.getenv("USER_CACHE_LOCAL_TIMEOUT") or 5)
+USER_CACHE_LOCAL_SIZE = int(os.getenv("USER_CACHE_LOCAL_SIZE") or 1000)
+
+EVENT_CLICK_FLUSH_INTERVAL = int(os.getenv("EVENT_CLICK_FLUSH_INTERVAL") or 10)
+
+EVENTS_UNVIEWED_COUNT_CACHE = (
+    (os.getenv("EVENTS_UNVIEWED_COUNT_CACHE") or "false").lower() == "true"
+)
+
+EVENTS_SEEN_BITMAPS = (os.getenv("EVENTS_SEEN_BITMAPS") or "false").lower() == "true"
+EVENTS_SEEN_BITMAP_MAX_IDS = int(os.getenv("EVENTS_SEEN_BITMAP_MAX_IDS") or 1000)
+
+# /metrics answers only to "Authorization: Bearer <METRICS_TOKEN>".
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+METRICS_FLUSH_SECONDS = int(os.getenv("METRICS_FLUSH_SECONDS") or 10)
+METRICS_SERVER_TIMING = (
+    (os.getenv("METRICS_SERVER_TIMING") or "true").lower() == "true"
+)
+
+# Requests are profiled when sampled or sent with the header printed by
+# `manage.py profile_token`. Only the newest PROFILING_MAX_PROFILES are kept.
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE") or 0)
+PROFILING_DIR = os.getenv("PROFILING_DIR") or os.path.join(BASE_DIR, "profiles")
+PROFILING_MAX_PROFILES = int(os.getenv("PROFILING_MAX_PROFILES") or 200)
+PROFILING_TOKEN_MAX_AGE = int(os.getenv("PROFILING_TOKEN_MAX_AGE") or 60 * 60)
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.MinimumLengthValidator",
@@ -121,7 +249,7 @@ AWS_S3_FILE_OVERWRITE = False
 
 STORAGES = {
     "default": {
-        "BACKEND": "storages.backends.s3boto3.S3Boto3Storage",
+        "BACKEND": "monitoring.backends.TimedS3Storage",
     },
     "staticfiles": {
         "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
@@ -139,11 +267,11 @@ REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
     "PAGE_SIZE": 8,
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "dj_rest_auth.jwt_auth.JWTCookieAuthentication",
+        "users.authentication.CachedJWTCookieAuthentication",
     ),
 }
 
-EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+EMAIL_BACKEND = "monitoring.backends.TimedEmailBackend"
 EMAIL_HOST = 'smtp.mail.ru'
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
@@ -176,6 +304,16 @@ ACCOUNT_EMAIL_CONFIRMATION_ANONYMOUS_REDIRECT_URL = "/auth/verification-success/
 ACCOUNT_EMAIL_CONFIRMATION_AUTHENTICATED_REDIRECT_URL = "/auth/verification-success/"
 
 FIREBASE_CREDENTIALS_PATH = os.path.join(BASE_DIR, "firebase-credentials.json")
+FCM_TRANSPORT = os.getenv("FCM_TRANSPORT") or "events.utils.FirebaseTransport"
+# Concurrent FCM requests per broadcast, one per token. The notification
+# worker runs NOTIFICATION_WORKERS broadcasts at once, so it makes at most
+# FCM_MAX_WORKERS * NOTIFICATION_WORKERS requests at a time.
+FCM_MAX_WORKERS = int(os.getenv("FCM_MAX_WORKERS") or 50)
+
+NOTIFICATION_POLL_INTERVAL = int(os.getenv("NOTIFICATION_POLL_INTERVAL") or 5)
+NOTIFICATION_WORKERS = int(os.getenv("NOTIFICATION_WORKERS") or 4)
+NOTIFICATION_MAX_ATTEMPTS = int(os.getenv("NOTIFICATION_MAX_ATTEMPTS") or 5)
+NOTIFICATION_RETRY_DELAY = int(os.getenv("NOTIFICATION_RETRY_DELAY") or 30)
 
 CORS_ALLOW_ALL_ORIGINS = True
 
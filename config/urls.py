@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include, re_path
 
@@ -10,6 +11,7 @@ from events.views import (
     EventDetailAPIView,
     UnviewedEventsCountAPIView,
     EventListView,
+    EventInteractionsBatchAPIView,
 )
 from users.views import (
     PasswordResetConfirmView,
@@ -18,10 +20,20 @@ from users.views import (
 )
 
 from users.views import VerificationSuccessView, CustomConfirmEmailView
+from monitoring.views import metrics_view
+
+# Under ASGI the read-heavy event endpoints are served by native async views.
+if settings.SERVER_MODE == "asgi":
+    from events.async_views import (
+        AsyncEventDetailAPIView as EventDetailAPIView,
+        AsyncEventListView as EventListView,
+        AsyncUnviewedEventsCountAPIView as UnviewedEventsCountAPIView,
+    )
 
 urlpatterns = [
     # Admin Site
     path("admin/", admin.site.urls),
+    path("metrics", metrics_view, name="metrics"),
     path('ckeditor5/', include('django_ckeditor_5.urls')),
     # Authentication URLs
     path("api/v1/auth/", include("dj_rest_auth.urls")),
@@ -77,6 +89,11 @@ urlpatterns = [
         name="event-link-track",
     ),
     path("api/v1/events/unviewed_count/", UnviewedEventsCountAPIView.as_view()),
+    path(
+        "api/v1/events/interactions/batch/",
+        EventInteractionsBatchAPIView.as_view(),
+        name="events-interactions-batch",
+    ),
     path(
         "api/v1/events/<uuid:event_id>/",
         EventDetailAPIView.as_view(),
@@ -7,4 +7,11 @@ done
 python manage.py makemigrations
 python manage.py migrate
 python manage.py collectstatic --noinput
-gunicorn config.wsgi:application --bind 0.0.0.0:8000 --workers 4 --timeout 120
\ No newline at end of file
+WEB_WORKERS=${WEB_WORKERS:-4}
+
+if [ "$SERVER_MODE" = "asgi" ]; then
+  gunicorn config.asgi:application --bind 0.0.0.0:8000 --workers "$WEB_WORKERS" --timeout 120 \
+    --worker-class uvicorn_worker.UvicornWorker
+else
+  gunicorn config.wsgi:application --bind 0.0.0.0:8000 --workers "$WEB_WORKERS" --timeout 120
+fi
\ No newline at end of file
@@ -1,6 +1,6 @@
 from django.contrib import admin
-from django.db.models import Count, Q
-from .models import Event, EventView
+from django.utils import timezone
+from .models import Event, EventStats, EventView, NotificationOutbox
 
 
 class EventViewInline(admin.TabularInline):
@@ -10,9 +10,59 @@ class EventViewInline(admin.TabularInline):
     can_delete = False
 
 
+class NotificationOutboxInline(admin.TabularInline):
+    model = NotificationOutbox
+    extra = 0
+    fields = ("status", "attempts", "success_count", "failure_count", "sent_at")
+    readonly_fields = fields
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(NotificationOutbox)
+class NotificationOutboxAdmin(admin.ModelAdmin):
+    list_display = (
+        "event",
+        "status",
+        "attempts",
+        "success_count",
+        "failure_count",
+        "next_attempt_at",
+        "sent_at",
+    )
+    list_filter = ("status",)
+    list_select_related = ("event",)
+    readonly_fields = (
+        "event",
+        "status",
+        "attempts",
+        "next_attempt_at",
+        "success_count",
+        "failure_count",
+        "last_error",
+        "created_at",
+        "sent_at",
+    )
+    actions = ("retry_notifications",)
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description="Отправить повторно")
+    def retry_notifications(self, request, queryset):
+        updated = queryset.exclude(status="processing").update(
+            status="pending", attempts=0, next_attempt_at=timezone.now()
+        )
+        self.message_user(request, f"Уведомлений поставлено в очередь: {updated}")
+
+
 @admin.register(Event)
 class EventAdmin(admin.ModelAdmin):
+    inlines = (NotificationOutboxInline,)
     readonly_fields = (
+        "click",
         "views_total_display",
         "views_school_display",
         "views_student_display",
@@ -58,101 +108,83 @@ class EventAdmin(admin.ModelAdmin):
     )
 
     def get_queryset(self, request):
-        qs = super().get_queryset(request)
-        return qs.annotate(
-            views_total=Count("views", filter=Q(views__is_viewed=True)),
-            views_school=Count(
-                "views",
-                filter=Q(views__is_viewed=True, views__user__type="school"),
-            ),
-            views_student=Count(
-                "views",
-                filter=Q(views__is_viewed=True, views__user__type="student"),
-            ),
-            views_other=Count(
-                "views", filter=Q(views__is_viewed=True, views__user__type="other")
-            ),
-            total_likes=Count("views", filter=Q(views__is_liked=True)),
-            likes_school=Count(
-                "views",
-                filter=Q(views__is_liked=True, views__user__type="school"),
-            ),
-            likes_student=Count(
-                "views", filter=Q(views__is_liked=True, views__user__type="student")
-            ),
-            likes_other=Count(
-                "views", filter=Q(views__is_liked=True, views__user__type="other")
-            ),
-            links_total=Count("views", filter=Q(views__is_linked=True)),
-            links_school=Count(
-                "views",
-                filter=Q(views__is_linked=True, views__user__type="school"),
-            ),
-            links_student=Count(
-                "views",
-                filter=Q(views__is_linked=True, views__user__type="student"),
-            ),
-            links_other=Count(
-                "views", filter=Q(views__is_linked=True, views__user__type="other")
-            ),
+        return super().get_queryset(request).select_related("stats")
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            return super().save_model(request, obj, form, change)
+        # The click flush adds to the column in place, writing back the
+        # value loaded with the form would undo the clicks since then.
+        obj.save(
+            update_fields=[
+                field.name
+                for field in obj._meta.concrete_fields
+                if not field.primary_key and field.name != "click"
+            ]
         )
 
+    def get_stat(self, obj, field):
+        try:
+            return getattr(obj.stats, field)
+        except EventStats.DoesNotExist:
+            return 0
+
     def views_total_display(self, obj):
-        return getattr(obj, "views_total", 0)
+        return self.get_stat(obj, "views_total")
 
     views_total_display.short_description = "Просмотров всего"
 
     def views_school_display(self, obj):
-        return getattr(obj, "views_school", 0)
+        return self.get_stat(obj, "views_school")
 
     views_school_display.short_description = "Просмотров от школьников"
 
     def views_student_display(self, obj):
-        return getattr(obj, "views_student", 0)
+        return self.get_stat(obj, "views_student")
 
     views_student_display.short_description = "Просмотров от студентов"
 
     def views_other_display(self, obj):
-        return getattr(obj, "views_other", 0)
+        return self.get_stat(obj, "views_other")
 
     views_other_display.short_description = "Просмотров от других пользователей"
 
     def total_likes_display(self, obj):
-        return getattr(obj, "total_likes", 0)
+        return self.get_stat(obj, "likes_total")
 
     total_likes_display.short_description = "Всего лайков"
 
     def likes_school_display(self, obj):
-        return getattr(obj, "likes_school", 0)
+        return self.get_stat(obj, "likes_school")
 
     likes_school_display.short_description = "Лайков от школьников"
 
     def likes_student_display(self, obj):
-        return getattr(obj, "likes_student", 0)
+        return self.get_stat(obj, "likes_student")
 
     likes_student_display.short_description = "Лайков от студентов"
 
     def likes_other_display(self, obj):
-        return getattr(obj, "likes_other", 0)
+        return self.get_stat(obj, "likes_other")
 
     likes_other_display.short_description = "Лайков от других пользователей"
 
     def links_total_display(self, obj):
-        return getattr(obj, "links_total", 0)
+        return self.get_stat(obj, "links_total")
 
     links_total_display.short_description = "Переходов всего"
 
     def links_school_display(self, obj):
-        return getattr(obj, "links_school", 0)
+        return self.get_stat(obj, "links_school")
 
     links_school_display.short_description = "Переходов от школьников"
 
     def links_student_display(self, obj):
-        return getattr(obj, "links_student", 0)
+        return self.get_stat(obj, "links_student")
 
     links_student_display.short_description = "Переходов от студентов"
 
     def links_other_display(self, obj):
-        return getattr(obj, "links_other", 0)
+        return self.get_stat(obj, "links_other")
 
     links_other_display.short_description = "Переходов от других пользователей"
@@ -0,0 +1,59 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from rest_framework.response import Response
+
+from events import cache, counters
+from events.models import Event
+from events.views import EventDetailAPIView, EventListView, UnviewedEventsCountAPIView
+
+
+class AsyncAPIViewMixin:
+    """
+    Runs an APIView with `async def` handlers natively under ASGI.
+    Authentication, permissions and throttling are synchronous in DRF and
+    run in a worker thread, like any other blocking part of a handler.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            handler = self.http_method_not_allowed
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), handler)
+            response = handler(request, *args, **kwargs)
+            if asyncio.iscoroutine(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+class AsyncEventListView(AsyncAPIViewMixin, EventListView):
+    async def get(self, request, *args, **kwargs):
+        # Pagination and serialization are synchronous in DRF.
+        return await sync_to_async(self.list)(request, *args, **kwargs)
+
+
+class AsyncEventDetailAPIView(AsyncAPIViewMixin, EventDetailAPIView):
+    async def get(self, request, *args, **kwargs):
+        try:
+            event = await cache.aget_event(self.kwargs[self.lookup_field])
+        except Event.DoesNotExist:
+            raise Http404
+        self.check_object_permissions(request, event)
+        return await sync_to_async(self.respond)(request, event)
+
+
+class AsyncUnviewedEventsCountAPIView(AsyncAPIViewMixin, UnviewedEventsCountAPIView):
+    async def get(self, request):
+        return Response(await counters.aget_unviewed_counts(request.user))
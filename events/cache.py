@@ -0,0 +1,187 @@
+import copy
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from config import db_router
+from config.local_cache import LocalCache
+from events.models import Event, EventView
+from events.serializers import event_view_data
+from monitoring.metrics import cache_lookup
+
+LIST_VERSION_KEY = "events:list:version"
+LIST_PAGE_KEY = "events:list:{version}:{digest}"
+CLICKS_VERSION_KEY = "events:clicks:version"
+USER_VERSION_KEY = "events:user:{user_id}:version"
+EVENT_KEY = "events:object:{event_id}"
+
+
+local_events = LocalCache(
+    settings.EVENT_CACHE_LOCAL_SIZE, settings.EVENT_CACHE_LOCAL_TIMEOUT
+)
+
+
+def get_local_event(key):
+    event = local_events.get(key)
+    cache_lookup("event_local", event is not None)
+    # Views may set attributes on the instance, so each caller gets its own.
+    return copy.copy(event)
+
+
+def keep_local_event(key, event):
+    local_events.set(key, event)
+    return copy.copy(event)
+
+
+def get_event(event_id):
+    """
+    Read-through lookup of an Event by id: process memory first, then the
+    shared cache, then the database. Raises Event.DoesNotExist.
+    aget_event() is the same lookup for async views.
+    """
+    key = EVENT_KEY.format(event_id=event_id)
+    event = get_local_event(key)
+    if event is not None:
+        return event
+
+    event = cache.get(key)
+    cache_lookup("event", event is not None)
+    if event is None:
+        # Anything that fills a shared cache reads the primary, a lagging
+        # replica would keep serving the old row after invalidation.
+        with db_router.primary():
+            event = Event.objects.defer("search_vector").get(event_id=event_id)
+        cache.set(key, event, settings.EVENT_CACHE_TIMEOUT)
+    return keep_local_event(key, event)
+
+
+async def aget_event(event_id):
+    key = EVENT_KEY.format(event_id=event_id)
+    event = get_local_event(key)
+    if event is not None:
+        return event
+
+    event = await cache.aget(key)
+    cache_lookup("event", event is not None)
+    if event is None:
+        with db_router.primary():
+            event = await Event.objects.defer("search_vector").aget(event_id=event_id)
+        await cache.aset(key, event, settings.EVENT_CACHE_TIMEOUT)
+    return keep_local_event(key, event)
+
+
+def event_changed(event_id):
+    # Other processes drop their copy when its local TTL runs out.
+    key = EVENT_KEY.format(event_id=event_id)
+    cache.delete(key)
+    local_events.delete(key)
+
+
+def get_versions(*keys):
+    """
+    Versions are the time of the last change in nanoseconds, so they can
+    double as Last-Modified. A missing one starts at the current time.
+    """
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_version(key):
+    cache.set(key, time.time_ns(), None)
+
+
+def list_version():
+    return get_versions(LIST_VERSION_KEY)[0]
+
+
+def events_changed():
+    bump_version(LIST_VERSION_KEY)
+
+
+def clicks_changed():
+    bump_version(CLICKS_VERSION_KEY)
+
+
+def interactions_changed(user):
+    bump_version(USER_VERSION_KEY.format(user_id=user.id))
+
+
+def make_validators(versions, *parts):
+    """
+    Return a weak ETag and the Last-Modified time for a response that only
+    depends on `versions` and `parts`.
+    """
+    digest = hashlib.md5(":".join(map(str, [*versions, *parts])).encode())
+    last_modified = max(versions) // 10**9
+    return f'W/"{digest.hexdigest()}"', last_modified
+
+
+def list_validators(request, *keys):
+    # The date is part of it because `?active=true` depends on it.
+    user_key = USER_VERSION_KEY.format(user_id=request.user.id)
+    versions = get_versions(LIST_VERSION_KEY, user_key, *keys)
+    return make_validators(
+        versions, request.user.id, timezone.localdate(), request.build_absolute_uri()
+    )
+
+
+def event_validators(request, event):
+    user_key = USER_VERSION_KEY.format(user_id=request.user.id)
+    versions = get_versions(LIST_VERSION_KEY, user_key)
+    versions.append(int(event.updated_at.timestamp() * 10**9))
+    return make_validators(versions, request.user.id, event.event_id)
+
+
+def list_page_key(request):
+    # The date is part of the key because `?active=true` depends on it.
+    url = request.build_absolute_uri()
+    digest = hashlib.md5(f"{timezone.localdate()}:{url}".encode()).hexdigest()
+    return LIST_PAGE_KEY.format(version=list_version(), digest=digest)
+
+
+def get_list_page(request, user):
+    page = cache.get(list_page_key(request))
+    cache_lookup("event_list", page is not None)
+    if page is None:
+        return None
+    if not page["event_view"]:
+        return page["data"]
+    return overlay_event_views(page["data"], page["events"], user)
+
+
+def set_list_page(request, data, events, event_view=True):
+    # Only the part of the page that is the same for every user is stored,
+    # with what is needed to fill event_view back in for each user.
+    shared = dict(data)
+    shared["results"] = [
+        {key: value for key, value in item.items() if key != "event_view"}
+        for item in data["results"]
+    ]
+    page = {
+        "data": shared,
+        "events": [(event.event_id, event.created_at) for event in events],
+        "event_view": event_view,
+    }
+    cache.set(list_page_key(request), page, settings.EVENTS_LIST_CACHE_TIMEOUT)
+
+
+def overlay_event_views(data, events, user):
+    views = EventView.objects.filter(
+        user=user, event_id__in=[event_id for event_id, _ in events]
+    ).only("event_id", "is_viewed", "is_liked")
+    views = {view.event_id: view for view in views}
+
+    results = []
+    for item, (event_id, created_at) in zip(data["results"], events):
+        event_view = event_view_data(
+            views.get(event_id), created_at <= user.created_at
+        )
+        results.append({**item, "event_view": event_view})
+    return {**data, "results": results}
@@ -0,0 +1,75 @@
+import logging
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Coalesce
+
+from config.redis import get_redis_client
+from events import cache
+from events.models import Event
+
+logger = logging.getLogger(__name__)
+
+CLICKS_KEY = "events:clicks"
+
+
+def record_click(event_id):
+    client = get_redis_client()
+    if client is not None:
+        try:
+            client.hincrby(CLICKS_KEY, str(event_id), 1)
+            return
+        except Exception as e:
+            logger.warning(f"Failed to buffer click for event {event_id}: {str(e)}")
+
+    apply_clicks({str(event_id): 1})
+
+
+def apply_clicks(deltas):
+    add_clicks(deltas)
+    cache.clicks_changed()
+
+
+def add_clicks(deltas):
+    with transaction.atomic():
+        for event_id in sorted(deltas):
+            Event.objects.filter(event_id=event_id).update(
+                click=Coalesce(F("click"), 0) + deltas[event_id]
+            )
+
+
+def flush_clicks():
+    client = get_redis_client()
+    if client is None:
+        return 0
+
+    # Counts leave Redis atomically and go back if the update fails, so only
+    # a crash before the update commits loses a batch, and none is applied
+    # twice.
+    pipe = client.pipeline(transaction=True)
+    pipe.hgetall(CLICKS_KEY)
+    pipe.delete(CLICKS_KEY)
+    buffered, _ = pipe.execute()
+
+    deltas = {
+        event_id.decode(): int(delta)
+        for event_id, delta in buffered.items()
+        if int(delta)
+    }
+    if not deltas:
+        return 0
+
+    try:
+        add_clicks(deltas)
+    except Exception:
+        restore_clicks(client, deltas)
+        raise
+    cache.clicks_changed()
+    return len(deltas)
+
+
+def restore_clicks(client, deltas):
+    pipe = client.pipeline(transaction=True)
+    for event_id, delta in deltas.items():
+        pipe.hincrby(CLICKS_KEY, event_id, delta)
+    pipe.execute()
@@ -0,0 +1,169 @@
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from config import db_router
+from events import seen
+from events.models import Event
+from monitoring.metrics import cache_lookup
+
+TYPES = [choice[0] for choice in Event.TYPE_CHOICES]
+
+VERSION_KEY = "events:unviewed:version"
+TOTAL_KEY = "events:unviewed:total:{type}"
+SEEN_KEY = "events:unviewed:seen:{version}:{user_id}:{type}"
+CACHE_TIMEOUT = 60 * 10
+
+
+def count_rows(queryset):
+    return queryset.order_by().values("types_event").annotate(count=Count("pk"))
+
+
+def to_counts(rows):
+    counts = dict.fromkeys(TYPES, 0)
+    for row in rows:
+        counts[row["types_event"]] = row["count"]
+    return counts
+
+
+def count_by_type(queryset):
+    return to_counts(count_rows(queryset))
+
+
+async def acount_by_type(queryset):
+    return to_counts([row async for row in count_rows(queryset)])
+
+
+# unviewed = events of the type - events of the type the user has seen.
+# Totals are shared by everyone, seen counts are kept per user. The sync and
+# async lookups below share these helpers and only differ in their I/O.
+
+
+def get_total_keys():
+    return {t: TOTAL_KEY.format(type=t) for t in TYPES}
+
+
+def get_seen_keys(version, user):
+    return {t: seen_key(version, user.id, t) for t in TYPES}
+
+
+def cached_counts(cached, total_keys, seen_keys):
+    hit = all(key in cached for key in [*total_keys.values(), *seen_keys.values()])
+    cache_lookup("unviewed_counts", hit)
+    if not hit:
+        return None
+    return {t: max(cached[total_keys[t]] - cached[seen_keys[t]], 0) for t in TYPES}
+
+
+def counts_to_cache(total_keys, seen_keys, totals, unviewed):
+    return {total_keys[t]: totals[t] for t in TYPES} | {
+        seen_keys[t]: totals[t] - unviewed[t] for t in TYPES
+    }
+
+
+def get_unviewed_counts(user):
+    counts = seen.unviewed_counts(user)
+    if counts is not None:
+        return counts
+
+    if not settings.EVENTS_UNVIEWED_COUNT_CACHE:
+        return count_by_type(Event.objects.unviewed_by(user))
+
+    total_keys = get_total_keys()
+    cached = cache.get_many([VERSION_KEY, *total_keys.values()])
+    version = cached.get(VERSION_KEY)
+    if version is None:
+        version = reset_version()
+
+    seen_keys = get_seen_keys(version, user)
+    cached.update(cache.get_many(seen_keys.values()))
+    counts = cached_counts(cached, total_keys, seen_keys)
+    if counts is not None:
+        return counts
+
+    with db_router.primary():
+        totals = count_by_type(Event.objects.all())
+        unviewed = count_by_type(Event.objects.unviewed_by(user))
+    cache.set_many(
+        counts_to_cache(total_keys, seen_keys, totals, unviewed), CACHE_TIMEOUT
+    )
+    return unviewed
+
+
+async def aget_unviewed_counts(user):
+    # The seen bitmaps are read with the synchronous Redis client.
+    if settings.EVENTS_SEEN_BITMAPS:
+        counts = await sync_to_async(seen.unviewed_counts)(user)
+        if counts is not None:
+            return counts
+
+    if not settings.EVENTS_UNVIEWED_COUNT_CACHE:
+        return await acount_by_type(Event.objects.unviewed_by(user))
+
+    total_keys = get_total_keys()
+    cached = await cache.aget_many([VERSION_KEY, *total_keys.values()])
+    version = cached.get(VERSION_KEY)
+    if version is None:
+        version = await sync_to_async(reset_version)()
+
+    seen_keys = get_seen_keys(version, user)
+    cached.update(await cache.aget_many(seen_keys.values()))
+    counts = cached_counts(cached, total_keys, seen_keys)
+    if counts is not None:
+        return counts
+
+    with db_router.primary():
+        totals = await acount_by_type(Event.objects.all())
+        unviewed = await acount_by_type(Event.objects.unviewed_by(user))
+    await cache.aset_many(
+        counts_to_cache(total_keys, seen_keys, totals, unviewed), CACHE_TIMEOUT
+    )
+    return unviewed
+
+
+def event_created(event):
+    if settings.EVENTS_UNVIEWED_COUNT_CACHE:
+        incr(TOTAL_KEY.format(type=event.types_event))
+
+
+def event_viewed(user, event):
+    events_viewed(user, [event])
+
+
+def events_viewed(user, events):
+    seen.events_viewed(user, events)
+    if settings.EVENTS_UNVIEWED_COUNT_CACHE:
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            return
+        for event in events:
+            if not event.is_seen_at_signup(user):
+                incr(seen_key(version, user.id, event.types_event))
+
+
+def events_changed():
+    # Which users had seen a changed or deleted event is unknown here, so
+    # every per-user count is dropped and rebuilt on the next poll.
+    if settings.EVENTS_UNVIEWED_COUNT_CACHE:
+        cache.delete_many([TOTAL_KEY.format(type=t) for t in TYPES])
+        if incr(VERSION_KEY) is None:
+            reset_version()
+
+
+def reset_version():
+    cache.add(VERSION_KEY, time.time_ns(), None)
+    return cache.get(VERSION_KEY)
+
+
+def seen_key(version, user_id, event_type):
+    return SEEN_KEY.format(version=version, user_id=user_id, type=event_type)
+
+
+def incr(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        return None
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from events import cache
+from events.models import Event, backfill_descriptions
+
+
+class Command(BaseCommand):
+    help = "Re-derive sanitized description HTML, plain text, excerpt and search vector"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=500, help="Rows updated per batch"
+        )
+
+    def handle(self, *args, **options):
+        done = 0
+        for ids in backfill_descriptions(Event, batch_size=options["batch_size"]):
+            # Detail responses come from the event cache, not the lists.
+            for event_id in ids:
+                cache.event_changed(event_id)
+            done += len(ids)
+            self.stdout.write(f"Processed {done} events")
+        cache.events_changed()
+        self.stdout.write(self.style.SUCCESS(f"Descriptions derived for {done} events"))
@@ -0,0 +1,49 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from events.models import EventView
+
+
+class Command(BaseCommand):
+    help = "Delete the EventView placeholder rows that used to be created at signup"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=5000, help="Rows deleted per batch"
+        )
+        parser.add_argument(
+            "--grace",
+            type=int,
+            default=60,
+            help="Seconds after signup in which a row counts as a placeholder",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        placeholders = EventView.objects.filter(
+            is_viewed=True,
+            is_liked=False,
+            is_linked=False,
+            event__created_at__lte=F("user__created_at"),
+            created_at__lte=F("user__created_at") + timedelta(seconds=options["grace"]),
+        ).order_by("id")
+
+        deleted = 0
+        last_id = 0
+        while True:
+            ids = list(
+                placeholders.filter(id__gt=last_id).values_list("id", flat=True)[
+                    :batch_size
+                ]
+            )
+            if not ids:
+                break
+
+            EventView.objects.filter(id__in=ids).delete()
+            deleted += len(ids)
+            last_id = ids[-1]
+            self.stdout.write(f"Deleted {deleted} placeholder rows")
+
+        self.stdout.write(self.style.SUCCESS(f"Done, {deleted} rows deleted"))
@@ -0,0 +1,51 @@
+import logging
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from events.clicks import flush_clicks
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Apply buffered event clicks to the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=settings.EVENT_CLICK_FLUSH_INTERVAL,
+            help="Seconds between flushes",
+        )
+        parser.add_argument(
+            "--once", action="store_true", help="Flush once and exit"
+        )
+
+    def handle(self, *args, **options):
+        if options["once"]:
+            flushed = flush_clicks()
+            self.stdout.write(f"Flushed clicks for {flushed} events")
+            return
+
+        self.stopped = threading.Event()
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        interval = options["interval"]
+        self.stdout.write(f"Flushing event clicks every {interval}s")
+        while not self.stopped.wait(interval):
+            self.flush()
+
+        self.flush()
+
+    def flush(self):
+        try:
+            flush_clicks()
+        except Exception as e:
+            logger.error(f"Failed to flush event clicks: {str(e)}")
+
+    def stop(self, signum, frame):
+        self.stopped.set()
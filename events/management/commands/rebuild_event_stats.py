@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from events.models import EventStats
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-event engagement stats from EventView rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=1000, help="Rows written per batch"
+        )
+
+    def handle(self, *args, **options):
+        EventStats.rebuild(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS("Event stats rebuilt"))
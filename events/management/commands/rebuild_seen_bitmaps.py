@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from events import seen
+
+
+class Command(BaseCommand):
+    help = "Drop the seen-set bitmaps and rebuild the event catalogs"
+
+    def handle(self, *args, **options):
+        client = seen.get_client()
+        if client is None:
+            raise CommandError("EVENTS_SEEN_BITMAPS and REDIS_URL must be set")
+
+        dropped = seen.rebuild(client)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Dropped {dropped} bitmaps, user seen-sets rebuild on next use"
+            )
+        )
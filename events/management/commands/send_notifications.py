@@ -0,0 +1,67 @@
+import logging
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from events.notifications import claim_notifications, deliver_notification
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Deliver queued event notifications"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=settings.NOTIFICATION_POLL_INTERVAL,
+            help="Seconds between polls when the outbox is empty",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.NOTIFICATION_WORKERS,
+            help="Number of notifications delivered concurrently",
+        )
+        parser.add_argument(
+            "--once", action="store_true", help="Deliver due notifications and exit"
+        )
+
+    def handle(self, *args, **options):
+        self.stopped = threading.Event()
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        workers = options["workers"]
+        self.stdout.write(f"Delivering notifications with {workers} workers")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while not self.stopped.is_set():
+                close_old_connections()
+                try:
+                    jobs = claim_notifications(workers)
+                except Exception as e:
+                    logger.error(f"Failed to claim notifications: {str(e)}")
+                    jobs = []
+
+                if jobs:
+                    list(executor.map(self.deliver, jobs))
+                elif options["once"]:
+                    break
+                else:
+                    self.stopped.wait(options["interval"])
+
+    def deliver(self, job):
+        try:
+            deliver_notification(job)
+        except Exception as e:
+            logger.error(f"Failed to deliver notification {job.pk}: {str(e)}")
+        finally:
+            connection.close()
+
+    def stop(self, signum, frame):
+        self.stopped.set()
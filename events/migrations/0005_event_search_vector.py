@@ -0,0 +1,39 @@
+# Generated by Django 5.2.2 on 2026-10-18 02:18
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0004_notificationoutbox'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='event',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(
+            """
+            UPDATE events_event SET search_vector =
+                setweight(to_tsvector('russian', coalesce(title, '')), 'A')
+                || setweight(to_tsvector('russian', coalesce(company, '')), 'B')
+                || setweight(to_tsvector('russian', regexp_replace(description, '<[^>]*>', ' ', 'g')), 'C')
+            """,
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='event_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='event_title_trgm_idx', opclasses=('gin_trgm_ops',)),
+        ),
+    ]
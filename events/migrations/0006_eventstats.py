@@ -0,0 +1,74 @@
+# Generated by Django 5.2.2 on 2026-10-18 02:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0005_event_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventStats',
+            fields=[
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='events.event')),
+                ('views_total', models.IntegerField(default=0)),
+                ('views_school', models.IntegerField(default=0)),
+                ('views_student', models.IntegerField(default=0)),
+                ('views_other', models.IntegerField(default=0)),
+                ('likes_total', models.IntegerField(default=0)),
+                ('likes_school', models.IntegerField(default=0)),
+                ('likes_student', models.IntegerField(default=0)),
+                ('likes_other', models.IntegerField(default=0)),
+                ('links_total', models.IntegerField(default=0)),
+                ('links_school', models.IntegerField(default=0)),
+                ('links_student', models.IntegerField(default=0)),
+                ('links_other', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Event stats',
+                'verbose_name_plural': 'Event stats',
+            },
+        ),
+        migrations.RunSQL(
+            """
+            INSERT INTO events_eventstats (
+                event_id,
+                views_total,
+                views_school,
+                views_student,
+                views_other,
+                likes_total,
+                likes_school,
+                likes_student,
+                likes_other,
+                links_total,
+                links_school,
+                links_student,
+                links_other
+            )
+            SELECT
+                e.event_id,
+                COUNT(v.id) FILTER (WHERE v.is_viewed),
+                COUNT(v.id) FILTER (WHERE v.is_viewed AND u.type = 'school'),
+                COUNT(v.id) FILTER (WHERE v.is_viewed AND u.type = 'student'),
+                COUNT(v.id) FILTER (WHERE v.is_viewed AND u.type = 'other'),
+                COUNT(v.id) FILTER (WHERE v.is_liked),
+                COUNT(v.id) FILTER (WHERE v.is_liked AND u.type = 'school'),
+                COUNT(v.id) FILTER (WHERE v.is_liked AND u.type = 'student'),
+                COUNT(v.id) FILTER (WHERE v.is_liked AND u.type = 'other'),
+                COUNT(v.id) FILTER (WHERE v.is_linked),
+                COUNT(v.id) FILTER (WHERE v.is_linked AND u.type = 'school'),
+                COUNT(v.id) FILTER (WHERE v.is_linked AND u.type = 'student'),
+                COUNT(v.id) FILTER (WHERE v.is_linked AND u.type = 'other')
+            FROM events_event e
+            LEFT JOIN events_eventview v ON v.event_id = e.event_id
+            LEFT JOIN users_user u ON u.id = v.user_id
+            GROUP BY e.event_id
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.2 on 2026-10-18 02:23
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('events', '0007_event_ordering_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='eventview',
+            index=models.Index(condition=models.Q(('is_liked', True)), fields=['user', '-liked_at'], include=('event',), name='eventview_user_liked_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='eventview',
+            index=models.Index(condition=models.Q(('is_viewed', True)), fields=['user', 'event'], name='eventview_user_viewed_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='eventview',
+            index=models.Index(fields=['event'], include=('user', 'is_viewed', 'is_liked', 'is_linked'), name='eventview_event_flags_idx'),
+        ),
+    ]
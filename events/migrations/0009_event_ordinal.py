@@ -0,0 +1,54 @@
+# Generated by Django 5.2.2 on 2026-10-18 02:29
+
+from django.db import migrations, models
+
+
+class NextVal(models.Func):
+    # Frozen copy of events.models.NextVal. It deconstructs under the same
+    # path so the migration state still matches the model.
+    function = "nextval"
+    output_field = models.BigIntegerField()
+
+    def deconstruct(self):
+        _, args, kwargs = super().deconstruct()
+        return "events.models.NextVal", args, kwargs
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0008_eventview_access_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "CREATE SEQUENCE events_event_ordinal_seq",
+            # Already dropped along with the column that owns it.
+            "DROP SEQUENCE IF EXISTS events_event_ordinal_seq",
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='ordinal',
+            field=models.BigIntegerField(db_default=NextVal(models.Value('events_event_ordinal_seq')), editable=False),
+        ),
+        # Existing events are numbered in publication order.
+        migrations.RunSQL(
+            """
+            UPDATE events_event SET ordinal = numbered.ordinal
+            FROM (
+                SELECT event_id, row_number() OVER (ORDER BY created_at, event_id) AS ordinal
+                FROM events_event
+            ) numbered
+            WHERE numbered.event_id = events_event.event_id;
+            SELECT setval('events_event_ordinal_seq', COALESCE(MAX(ordinal), 0) + 1, false)
+            FROM events_event;
+            ALTER SEQUENCE events_event_ordinal_seq OWNED BY events_event.ordinal;
+            """,
+            migrations.RunSQL.noop,
+        ),
+        migrations.AlterField(
+            model_name='event',
+            name='ordinal',
+            field=models.BigIntegerField(db_default=NextVal(models.Value('events_event_ordinal_seq')), editable=False, unique=True),
+        ),
+    ]
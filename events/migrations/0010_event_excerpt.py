@@ -0,0 +1,19 @@
+# Generated by Django 5.2.2 on 2026-10-18 02:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0009_event_ordinal'),
+    ]
+
+    # Filled in by 0011, which derives every description field.
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=200),
+        ),
+    ]
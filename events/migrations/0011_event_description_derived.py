@@ -0,0 +1,219 @@
+# Generated by Django 5.2.2 on 2026-10-18 02:35
+
+from html import escape
+from html.parser import HTMLParser
+from urllib.parse import urlparse
+
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models, transaction
+from django.utils.text import Truncator
+
+# A frozen copy of events.sanitizer and events.models.derive_description,
+# so that later changes to them don't change what this migration does.
+# backfill_event_descriptions re-derives rows with the current code.
+
+# What the CKEditor "extends" toolbar can produce, minus inline styles, so
+# font size, family and colours are lost. Media embeds are kept as
+# <oembed url> for the clients to render, to-do items as disabled
+# checkboxes.
+ALLOWED_TAGS = {
+    "a", "b", "blockquote", "br", "code", "del", "em", "figcaption", "figure",
+    "h1", "h2", "h3", "h4", "h5", "h6", "hr", "i", "img", "input", "label",
+    "li", "mark", "oembed", "ol", "p", "pre", "s", "span", "strong", "sub",
+    "sup", "table", "tbody", "td", "th", "thead", "tr", "u", "ul",
+}
+ALLOWED_ATTRIBUTES = {
+    "a": {"href", "title"},
+    "img": {"src", "alt", "width", "height"},
+    "td": {"colspan", "rowspan"},
+    "th": {"colspan", "rowspan"},
+    "figure": {"class"},
+    "mark": {"class"},
+    "oembed": {"url"},
+    "ol": {"start", "reversed"},
+    "ul": {"class"},
+    "label": {"class"},
+    "span": {"class"},
+    "input": {"type", "checked", "disabled"},
+}
+BOOLEAN_ATTRIBUTES = {"checked", "disabled", "reversed"}
+URL_ATTRIBUTES = {"href", "src", "url"}
+URL_SCHEMES = {"http", "https", "mailto"}
+# Elements without an end tag.
+VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link",
+    "meta", "source", "track", "wbr",
+}
+# Opening one of these closes a sibling of the same tag left open.
+SIBLING_TAGS = {"li", "p", "td", "th", "tr"}
+# Dropped together with everything inside them, void ones just by themselves.
+DROPPED_TAGS = {"script", "style", "iframe", "object", "embed", "template"}
+# Start a new line in the plain text.
+BLOCK_TAGS = {
+    "blockquote", "br", "div", "figcaption", "figure", "h1", "h2", "h3", "h4",
+    "h5", "h6", "hr", "li", "ol", "p", "pre", "table", "tr", "ul",
+}
+
+
+class DescriptionParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.html = []
+        self.text = []
+        self.open_tags = []
+        self.dropped = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROPPED_TAGS:
+            if tag not in VOID_TAGS:
+                self.dropped += 1
+            return
+        if self.dropped:
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append("\n")
+        if tag not in ALLOWED_TAGS:
+            return
+        if tag == "input":
+            # Only the to-do list checkboxes, and readers can't tick them.
+            if dict(attrs).get("type") != "checkbox":
+                return
+            attrs = [*attrs, ("disabled", None)]
+
+        if tag in SIBLING_TAGS and self.open_tags and self.open_tags[-1] == tag:
+            self.html.append(f"</{self.open_tags.pop()}>")
+
+        allowed = ALLOWED_ATTRIBUTES.get(tag, set())
+        rendered = [tag]
+        for name, value in attrs:
+            if name not in allowed or name in rendered:
+                continue
+            if name in BOOLEAN_ATTRIBUTES:
+                rendered.append(name)
+                continue
+            if value is None:
+                continue
+            if name in URL_ATTRIBUTES and not is_safe_url(value):
+                continue
+            rendered.append(f'{name}="{escape(value)}"')
+        self.html.append(f"<{' '.join(rendered)}>")
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and tag not in DROPPED_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROPPED_TAGS:
+            if tag not in VOID_TAGS:
+                self.dropped = max(self.dropped - 1, 0)
+            return
+        if self.dropped:
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append("\n")
+        if tag not in self.open_tags:
+            return
+
+        # Close anything left open inside this tag as well.
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.html.append(f"</{open_tag}>")
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if self.dropped:
+            return
+        self.html.append(escape(data, quote=False))
+        self.text.append(data)
+
+    def close(self):
+        super().close()
+        while self.open_tags:
+            self.html.append(f"</{self.open_tags.pop()}>")
+
+
+def is_safe_url(value):
+    # Browsers ignore whitespace and control characters inside a scheme.
+    value = "".join(char for char in value if char > " ")
+    scheme = urlparse(value).scheme.lower()
+    if scheme:
+        return scheme in URL_SCHEMES
+    return ":" not in value.split("/", 1)[0]
+
+
+def sanitize_description(value):
+    """
+    Return the description as (sanitized HTML, plain text). The text keeps
+    one line per block element.
+    """
+    parser = DescriptionParser()
+    parser.feed(value or "")
+    parser.close()
+
+    lines = (" ".join(line.split()) for line in "".join(parser.text).splitlines())
+    return "".join(parser.html), "\n".join(line for line in lines if line)
+
+
+EXCERPT_LENGTH = 200
+
+
+def derive_description(value):
+    description_html, description_text = sanitize_description(value)
+    excerpt = Truncator(" ".join(description_text.split())).chars(EXCERPT_LENGTH)
+    return {
+        "description_html": description_html,
+        "description_text": description_text,
+        "excerpt": excerpt,
+    }
+
+
+def fill_descriptions(apps, schema_editor):
+    Event = apps.get_model("events", "Event")
+    fields = ["description_html", "description_text", "excerpt"]
+    search_vector = (
+        SearchVector("title", weight="A", config="russian")
+        + SearchVector("company", weight="B", config="russian")
+        + SearchVector("description_text", weight="C", config="russian")
+    )
+    events = Event.objects.only("event_id", "description").order_by("event_id")
+    last_id = None
+    while True:
+        batch = events.filter(event_id__gt=last_id) if last_id else events
+        batch = list(batch[:500])
+        if not batch:
+            return
+
+        for event in batch:
+            for field, value in derive_description(event.description).items():
+                setattr(event, field, value)
+        with transaction.atomic():
+            Event.objects.bulk_update(batch, fields)
+            Event.objects.filter(
+                event_id__in=[event.event_id for event in batch]
+            ).update(search_vector=search_vector)
+        last_id = batch[-1].event_id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0010_event_excerpt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='description_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='description_text',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(fill_descriptions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ("events", "0011_event_description_derived"),
+    ]
+
+    # eventview_event_flags_idx starts with event_id, so the index Django
+    # creates for the foreign key only costs writes.
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name="eventview",
+                    name="event",
+                    field=models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="views",
+                        to="events.event",
+                    ),
+                ),
+            ],
+            database_operations=[
+                migrations.RunSQL(
+                    "DROP INDEX CONCURRENTLY IF EXISTS events_eventview_event_id_9e97a78d",
+                    reverse_sql=(
+                        "CREATE INDEX CONCURRENTLY IF NOT EXISTS "
+                        "events_eventview_event_id_9e97a78d "
+                        "ON events_eventview (event_id)"
+                    ),
+                ),
+            ],
+        ),
+    ]
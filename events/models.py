@@ -2,12 +2,66 @@ import os
 import uuid
 
 from django.contrib.auth import get_user_model
-from django.contrib.postgres.indexes import HashIndex
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex, HashIndex
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    SearchVectorField,
+    TrigramWordSimilarity,
+)
+from django.db import connection, models, transaction
+from django.utils import timezone
+from django.utils.text import Truncator
 from django_ckeditor_5.fields import CKEditor5Field
 
+from config import db_router
+from events.sanitizer import sanitize_description
+
 User = get_user_model()
 
+SEARCH_CONFIG = "russian"
+
+
+def derive_description(value):
+    description_html, description_text = sanitize_description(value)
+    excerpt = Truncator(" ".join(description_text.split())).chars(
+        Event.EXCERPT_LENGTH
+    )
+    return {
+        "description_html": description_html,
+        "description_text": description_text,
+        "excerpt": excerpt,
+    }
+
+
+def backfill_descriptions(model, batch_size=500):
+    """
+    Re-derive the description fields and search vectors of every event,
+    `batch_size` rows at a time in primary key order. Yields the ids of
+    each batch once it is saved.
+    """
+    fields = ["description_html", "description_text", "excerpt"]
+    events = model.objects.only("event_id", "description").order_by("event_id")
+    last_id = None
+    while True:
+        batch = events.filter(event_id__gt=last_id) if last_id else events
+        batch = list(batch[:batch_size])
+        if not batch:
+            return
+
+        for event in batch:
+            for field, value in derive_description(event.description).items():
+                setattr(event, field, value)
+        with transaction.atomic():
+            model.objects.bulk_update(batch, fields)
+            ids = [event.event_id for event in batch]
+            model.objects.filter(event_id__in=ids).update(
+                search_vector=Event.build_search_vector()
+            )
+        last_id = batch[-1].event_id
+        yield ids
+
 
 def get_image_path(instance, filename):
     ext = filename.split(".")[-1]
@@ -15,6 +69,48 @@ def get_image_path(instance, filename):
     return os.path.join("media/images", filename)
 
 
+class NextVal(models.Func):
+    function = "nextval"
+    output_field = models.BigIntegerField()
+
+
+class EventQuerySet(models.QuerySet):
+    def with_user_views(self, user):
+        return self.prefetch_related(
+            models.Prefetch(
+                "views",
+                queryset=EventView.objects.filter(user=user),
+                to_attr="user_views",
+            )
+        )
+
+    def unviewed_by(self, user):
+        # Events published before the user signed up count as already seen.
+        return self.filter(
+            ~models.Exists(
+                EventView.objects.filter(
+                    user=user, event=models.OuterRef("pk"), is_viewed=True
+                )
+            ),
+            created_at__gt=user.created_at,
+        )
+
+    def search(self, query):
+        # Full-text matches are ranked first; trigram similarity on the title
+        # catches typos and the substring match keeps the old behaviour.
+        search_query = SearchQuery(
+            query, config=SEARCH_CONFIG, search_type="websearch"
+        )
+        return self.annotate(
+            rank=SearchRank(models.F("search_vector"), search_query),
+            similarity=TrigramWordSimilarity(query, "title"),
+        ).filter(
+            models.Q(search_vector=search_query)
+            | models.Q(title__trigram_word_similar=query)
+            | models.Q(title__icontains=query)
+        )
+
+
 class Event(models.Model):
     TYPE_CHOICES = [
         ("grant", "Grant"),
@@ -23,6 +119,7 @@ class Event(models.Model):
         ("olympiad", "Olympiad"),
         ("course", "Course"),
     ]
+    EXCERPT_LENGTH = 200
 
     event_id = models.UUIDField(
         primary_key=True, default=uuid.uuid4, editable=False, db_index=True
@@ -37,24 +134,326 @@ class Event(models.Model):
     click = models.IntegerField(blank=True, null=True, default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Derived from description on save, see derive_description().
+    description_html = models.TextField(blank=True, editable=False)
+    description_text = models.TextField(blank=True, editable=False)
+    excerpt = models.CharField(max_length=EXCERPT_LENGTH, blank=True, editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Dense, never reused number used as the event's bit in seen-set bitmaps.
+    ordinal = models.BigIntegerField(
+        unique=True,
+        editable=False,
+        db_default=NextVal(models.Value("events_event_ordinal_seq")),
+    )
+
+    objects = EventQuerySet.as_manager()
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        derived = derive_description(self.description)
+        for field, value in derived.items():
+            setattr(self, field, value)
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "description" in update_fields:
+            kwargs["update_fields"] = {*update_fields, *derived}
+        super().save(*args, **kwargs)
+
+    def is_seen_at_signup(self, user):
+        return self.created_at <= user.created_at
+
+    @staticmethod
+    def build_search_vector():
+        return (
+            SearchVector("title", weight="A", config=SEARCH_CONFIG)
+            + SearchVector("company", weight="B", config=SEARCH_CONFIG)
+            + SearchVector("description_text", weight="C", config=SEARCH_CONFIG)
+        )
+
+    def update_search_vector(self):
+        Event.objects.filter(pk=self.pk).update(
+            search_vector=Event.build_search_vector()
+        )
+
     class Meta:
         verbose_name = "Event"
         verbose_name_plural = "Events"
-        indexes = (HashIndex(fields=("event_id",), name="uuid_hash_index"),)
+        indexes = (
+            HashIndex(fields=("event_id",), name="uuid_hash_index"),
+            GinIndex(fields=("search_vector",), name="event_search_idx"),
+            GinIndex(
+                fields=("title",),
+                opclasses=("gin_trgm_ops",),
+                name="event_title_trgm_idx",
+            ),
+            models.Index(fields=("-created_at", "-event_id"), name="event_created_idx"),
+            models.Index(fields=("deadline", "event_id"), name="event_deadline_idx"),
+            models.Index(fields=("-click", "-event_id"), name="event_click_idx"),
+            models.Index(fields=("title", "event_id"), name="event_title_idx"),
+            models.Index(
+                fields=("types_event", "-created_at", "-event_id"),
+                name="event_type_created_idx",
+            ),
+            models.Index(
+                fields=("types_event", "deadline", "event_id"),
+                name="event_type_deadline_idx",
+            ),
+            models.Index(
+                fields=("types_event", "-click", "-event_id"),
+                name="event_type_click_idx",
+            ),
+            models.Index(
+                fields=("types_event", "title", "event_id"),
+                name="event_type_title_idx",
+            ),
+        )
+
+
+class EventViewManager(models.Manager):
+    FLAGS = {"view": "is_viewed", "like": "is_liked", "link": "is_linked"}
+
+    def mark(self, user, action, items):
+        """
+        Apply `action` ("view", "like", "link" or "unlike") for `user` to
+        every event in `items`, a mapping of event_id to the time of the
+        action, in a single statement. Returns {event_id: changed} for the
+        events that exist; unknown ids are left out.
+        """
+        if not items:
+            return {}
+
+        event_ids = [str(event_id) for event_id in items]
+        params = {
+            "user_id": user.pk,
+            "event_ids": event_ids,
+            "times": [items[event_id] for event_id in items],
+        }
+        with connection.cursor() as cursor:
+            cursor.execute(self.build_mark_sql(action), params)
+            changed = {event_id: changed for event_id, changed in cursor.fetchall()}
+
+        if any(changed.values()):
+            db_router.pin_user(user.pk)
+        return changed
+
+    def build_mark_sql(self, action):
+        table = self.model._meta.db_table
+        target = f"""
+            WITH target AS (
+                SELECT item.event_id, item.at
+                FROM unnest(%(event_ids)s::uuid[], %(times)s::timestamptz[])
+                    AS item(event_id, at)
+                JOIN {Event._meta.db_table} event ON event.event_id = item.event_id
+            )
+        """
+        if action == "unlike":
+            changed = f"""
+                UPDATE {table} SET is_liked = FALSE
+                WHERE user_id = %(user_id)s
+                    AND event_id IN (SELECT event_id FROM target)
+                    AND is_liked
+                RETURNING event_id
+            """
+        else:
+            flag = self.FLAGS[action]
+            values = {
+                "is_viewed": "FALSE",
+                "is_liked": "FALSE",
+                "is_linked": "FALSE",
+                flag: "TRUE",
+            }
+            updates = [f"{flag} = TRUE"]
+            liked_at = "NULL"
+            if action == "like":
+                liked_at = "target.at"
+                updates.append("liked_at = EXCLUDED.liked_at")
+            changed = f"""
+                INSERT INTO {table} (
+                    user_id, event_id, is_viewed, is_liked, is_linked,
+                    created_at, liked_at
+                )
+                SELECT
+                    %(user_id)s, target.event_id, {values["is_viewed"]},
+                    {values["is_liked"]}, {values["is_linked"]}, NOW(), {liked_at}
+                FROM target
+                ON CONFLICT (user_id, event_id) DO UPDATE SET {", ".join(updates)}
+                WHERE NOT {table}.{flag}
+                RETURNING event_id
+            """
+        return f"""
+            {target}, changed AS ({changed})
+            SELECT target.event_id, changed.event_id IS NOT NULL
+            FROM target LEFT JOIN changed ON changed.event_id = target.event_id
+        """
 
 
 class EventView(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="event_views")
-    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name="views")
+    # Indexed by eventview_event_flags_idx, which covers the engagement counts.
+    event = models.ForeignKey(
+        Event, on_delete=models.CASCADE, related_name="views", db_index=False
+    )
     is_viewed = models.BooleanField(default=False)
     is_liked = models.BooleanField(default=False)
     is_linked = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     liked_at = models.DateTimeField(null=True, blank=True)
 
+    objects = EventViewManager()
+
+    class Meta:
+        unique_together = ("user", "event")
+        indexes = (
+            # Favorites feed: the user's liked rows newest first.
+            models.Index(
+                fields=("user", "-liked_at"),
+                include=("event",),
+                condition=models.Q(is_liked=True),
+                name="eventview_user_liked_idx",
+            ),
+            # Unviewed anti-join: index-only probe per (user, event).
+            models.Index(
+                fields=("user", "event"),
+                condition=models.Q(is_viewed=True),
+                name="eventview_user_viewed_idx",
+            ),
+            # Per-event engagement counts, see EventStats.rebuild.
+            models.Index(
+                fields=("event",),
+                include=("user", "is_viewed", "is_liked", "is_linked"),
+                name="eventview_event_flags_idx",
+            ),
+        )
+
+class EventStats(models.Model):
+    METRICS = ("views", "likes", "links")
+    USER_TYPES = ("school", "student", "other")
+    FLAGS = {"views": "is_viewed", "likes": "is_liked", "links": "is_linked"}
+
+    event = models.OneToOneField(
+        Event, primary_key=True, on_delete=models.CASCADE, related_name="stats"
+    )
+    views_total = models.IntegerField(default=0)
+    views_school = models.IntegerField(default=0)
+    views_student = models.IntegerField(default=0)
+    views_other = models.IntegerField(default=0)
+    likes_total = models.IntegerField(default=0)
+    likes_school = models.IntegerField(default=0)
+    likes_student = models.IntegerField(default=0)
+    likes_other = models.IntegerField(default=0)
+    links_total = models.IntegerField(default=0)
+    links_school = models.IntegerField(default=0)
+    links_student = models.IntegerField(default=0)
+    links_other = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Event stats"
+        verbose_name_plural = "Event stats"
+
+    @classmethod
+    def counter_fields(cls):
+        return [
+            f"{metric}_{suffix}"
+            for metric in cls.METRICS
+            for suffix in ("total", *cls.USER_TYPES)
+        ]
+
+    @classmethod
+    def increments(cls, user_type, deltas):
+        updates = {}
+        for metric, delta in deltas.items():
+            if not delta:
+                continue
+            updates[f"{metric}_total"] = models.F(f"{metric}_total") + delta
+            if user_type in cls.USER_TYPES:
+                field = f"{metric}_{user_type}"
+                updates[field] = models.F(field) + delta
+        return updates
+
+    @classmethod
+    def record(cls, event_id, user_type, **deltas):
+        updates = cls.increments(user_type, deltas)
+        if not updates:
+            return
+        if not cls.objects.filter(event_id=event_id).update(**updates):
+            cls.objects.get_or_create(event_id=event_id)
+            cls.objects.filter(event_id=event_id).update(**updates)
+
+    @classmethod
+    def record_user(cls, user_id, user_type, sign):
+        """
+        Add (sign=1) or remove (sign=-1) everything a user did from the stats,
+        with one UPDATE per combination of flags instead of one per event.
+        """
+        views = EventView.objects.filter(user_id=user_id).order_by()
+        flags = list(cls.FLAGS.values())
+        for values in views.values_list(*flags).distinct():
+            updates = cls.increments(
+                user_type,
+                {metric: sign for metric, value in zip(cls.FLAGS, values) if value},
+            )
+            if updates:
+                events = views.filter(**dict(zip(flags, values))).values("event_id")
+                cls.objects.filter(event_id__in=events).update(**updates)
+
+    @classmethod
+    def rebuild(cls, batch_size=1000):
+        counts = {}
+        for metric, flag in cls.FLAGS.items():
+            counts[f"{metric}_total"] = models.Count(
+                "id", filter=models.Q(**{flag: True})
+            )
+            for user_type in cls.USER_TYPES:
+                counts[f"{metric}_{user_type}"] = models.Count(
+                    "id", filter=models.Q(**{flag: True, "user__type": user_type})
+                )
+
+        rows = EventView.objects.order_by().values("event_id").annotate(**counts)
+        stats = {row.pop("event_id"): row for row in rows}
+        cls.objects.bulk_create(
+            [
+                cls(event_id=event_id, **stats.get(event_id, {}))
+                for event_id in Event.objects.values_list("event_id", flat=True)
+            ],
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=["event"],
+            update_fields=cls.counter_fields(),
+        )
+
+
+class NotificationOutbox(models.Model):
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("processing", "Processing"),
+        ("sent", "Sent"),
+        ("failed", "Failed"),
+    ]
+
+    event = models.ForeignKey(
+        Event, on_delete=models.CASCADE, related_name="notifications"
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    success_count = models.PositiveIntegerField(default=0)
+    failure_count = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.event} - {self.status}"
+
     class Meta:
-        unique_together = ("user", "event")
\ No newline at end of file
+        verbose_name = "Notification"
+        verbose_name_plural = "Notifications"
+        indexes = (
+            models.Index(
+                fields=("next_attempt_at",),
+                condition=models.Q(status__in=("pending", "processing")),
+                name="outbox_due_idx",
+            ),
+        )
@@ -0,0 +1,96 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from events.models import NotificationOutbox
+from events.utils import FirebaseNotificationService
+
+logger = logging.getLogger(__name__)
+
+CLAIM_LEASE = timedelta(minutes=10)
+MAX_RETRY_DELAY = timedelta(hours=1)
+
+
+def claim_notifications(limit):
+    now = timezone.now()
+    with transaction.atomic():
+        # A job whose worker died on its last attempt never reached
+        # retry_notification(), so it is given up on here instead.
+        NotificationOutbox.objects.filter(
+            status="processing",
+            next_attempt_at__lte=now,
+            attempts__gte=settings.NOTIFICATION_MAX_ATTEMPTS,
+        ).update(status="failed", last_error="Worker stopped while sending")
+
+        jobs = list(
+            NotificationOutbox.objects.select_for_update(skip_locked=True, of=("self",))
+            .select_related("event")
+            .filter(
+                Q(status="pending") | Q(status="processing"),
+                next_attempt_at__lte=now,
+                attempts__lt=settings.NOTIFICATION_MAX_ATTEMPTS,
+            )
+            .order_by("next_attempt_at")[:limit]
+        )
+        if jobs:
+            # A claimed job becomes due again once its lease runs out, so
+            # jobs held by a crashed worker are picked up by the next one.
+            NotificationOutbox.objects.filter(pk__in=[job.pk for job in jobs]).update(
+                status="processing",
+                attempts=F("attempts") + 1,
+                next_attempt_at=now + CLAIM_LEASE,
+            )
+    for job in jobs:
+        job.attempts += 1
+    return jobs
+
+
+def deliver_notification(job):
+    try:
+        notification_service = FirebaseNotificationService()
+        if not notification_service.initialized:
+            raise RuntimeError("Firebase not initialized")
+
+        result = notification_service.send_event_notification(job.event)
+        if result["failure"] and not result["success"]:
+            # FCM reports outages and bad credentials per token instead of
+            # raising them, so a broadcast that reached no one is retried.
+            error = result["responses"][0]["error"]
+            raise RuntimeError(f"All {result['failure']} tokens failed: {error}")
+    except Exception as e:
+        retry_notification(job, e)
+        return
+
+    NotificationOutbox.objects.filter(pk=job.pk).update(
+        status="sent",
+        success_count=result["success"],
+        failure_count=result["failure"],
+        last_error="",
+        sent_at=timezone.now(),
+    )
+    logger.info(
+        f"Notification {job.pk} for event {job.event_id} sent: {result['success']} successful, {result['failure']} failed"
+    )
+
+
+def retry_notification(job, error):
+    if job.attempts >= settings.NOTIFICATION_MAX_ATTEMPTS:
+        status = "failed"
+        next_attempt_at = timezone.now()
+    else:
+        status = "pending"
+        delay = timedelta(
+            seconds=settings.NOTIFICATION_RETRY_DELAY * 2 ** (job.attempts - 1)
+        )
+        next_attempt_at = timezone.now() + min(delay, MAX_RETRY_DELAY)
+
+    NotificationOutbox.objects.filter(pk=job.pk).update(
+        status=status, next_attempt_at=next_attempt_at, last_error=str(error)
+    )
+    logger.error(
+        f"Failed to send notification {job.pk} for event {job.event_id} (attempt {job.attempts}): {str(error)}"
+    )
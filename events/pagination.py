@@ -0,0 +1,156 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class EventFeedPagination(LimitOffsetPagination):
+    """
+    Offset pagination by default. Clients opt into keyset pagination with
+    `?pagination=cursor` (or by sending a `cursor`), and can skip the
+    COUNT(*) of offset pagination with `?count=false`.
+    """
+
+    # Offset pages stay uncapped for existing clients.
+    cursor_max_limit = 100
+    cursor_query_param = "cursor"
+    mode_query_param = "pagination"
+    count_query_param = "count"
+    tiebreaker = "event_id"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.use_cursor = (
+            request.query_params.get(self.mode_query_param) == "cursor"
+            or self.cursor_query_param in request.query_params
+        )
+        if self.use_cursor:
+            return self.paginate_by_cursor(queryset, request)
+
+        if request.query_params.get(self.count_query_param, "").lower() == "false":
+            return self.paginate_without_count(queryset, request)
+
+        return super().paginate_queryset(queryset, request, view)
+
+    def paginate_without_count(self, queryset, request):
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+
+        self.offset = self.get_offset(request)
+        self.count = None
+        page = list(queryset[self.offset : self.offset + self.limit + 1])
+        self.has_next = len(page) > self.limit
+        return page[: self.limit]
+
+    def paginate_by_cursor(self, queryset, request):
+        self.limit = min(
+            self.get_limit(request) or self.default_limit, self.cursor_max_limit
+        )
+        self.ordering = self.get_ordering(queryset)
+        queryset = queryset.order_by(*self.ordering)
+
+        encoded = request.query_params.get(self.cursor_query_param)
+        try:
+            if encoded:
+                position = self.decode_cursor(encoded)
+                queryset = queryset.filter(self.keyset_filter(position))
+            page = list(queryset[: self.limit + 1])
+        except (DjangoValidationError, TypeError, ValueError):
+            # Well-formed JSON whose values don't fit the ordering fields.
+            raise NotFound(self.invalid_cursor_message)
+
+        self.has_next = len(page) > self.limit
+        page = page[: self.limit]
+        self.next_position = (
+            [getattr(page[-1], field.lstrip("-")) for field in self.ordering]
+            if self.has_next
+            else None
+        )
+        return page
+
+    def get_ordering(self, queryset):
+        ordering = [
+            field
+            for field in queryset.query.order_by
+            if isinstance(field, str) and "__" not in field and field != "?"
+        ]
+        if not ordering:
+            ordering = ["-created_at"]
+
+        if not {self.tiebreaker, "pk"} & {field.lstrip("-") for field in ordering}:
+            prefix = "-" if ordering[-1].startswith("-") else ""
+            ordering.append(prefix + self.tiebreaker)
+        return ordering
+
+    def keyset_filter(self, position):
+        # Rows after the cursor: equal on every earlier ordering field and
+        # strictly after it on the current one. NULLs sort first in
+        # descending and last in ascending order, as in PostgreSQL.
+        nothing = Q(pk__in=[])
+        condition = nothing
+        equal = Q()
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip("-")
+            descending = field.startswith("-")
+            if value is None:
+                after = Q(**{f"{name}__isnull": False}) if descending else nothing
+                same = Q(**{f"{name}__isnull": True})
+            else:
+                after = Q(**{f"{name}__{'lt' if descending else 'gt'}": value})
+                if not descending:
+                    after |= Q(**{f"{name}__isnull": True})
+                same = Q(**{name: value})
+            condition |= equal & after
+            equal &= same
+        return condition
+
+    def encode_cursor(self, position):
+        # Datetimes keep their microseconds so no row is skipped between pages.
+        data = json.dumps(
+            position, default=lambda value: getattr(value, "isoformat", value.__str__)()
+        ).encode()
+        return base64.urlsafe_b64encode(data).decode()
+
+    def decode_cursor(self, encoded):
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def get_next_link(self):
+        if self.use_cursor:
+            if not self.has_next:
+                return None
+            url = self.request.build_absolute_uri()
+            url = remove_query_param(url, self.offset_query_param)
+            url = replace_query_param(url, self.limit_query_param, self.limit)
+            return replace_query_param(
+                url, self.cursor_query_param, self.encode_cursor(self.next_position)
+            )
+
+        if self.count is None:
+            if not self.has_next:
+                return None
+            url = self.request.build_absolute_uri()
+            url = replace_query_param(url, self.limit_query_param, self.limit)
+            return replace_query_param(
+                url, self.offset_query_param, self.offset + self.limit
+            )
+
+        return super().get_next_link()
+
+    def get_paginated_response(self, data):
+        if self.use_cursor:
+            return Response({"next": self.get_next_link(), "results": data})
+        return super().get_paginated_response(data)
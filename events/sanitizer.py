@@ -0,0 +1,148 @@
+from html import escape
+from html.parser import HTMLParser
+from urllib.parse import urlparse
+
+# What the CKEditor "extends" toolbar can produce, minus inline styles, so
+# font size, family and colours are lost. Media embeds are kept as
+# <oembed url> for the clients to render, to-do items as disabled
+# checkboxes.
+ALLOWED_TAGS = {
+    "a", "b", "blockquote", "br", "code", "del", "em", "figcaption", "figure",
+    "h1", "h2", "h3", "h4", "h5", "h6", "hr", "i", "img", "input", "label",
+    "li", "mark", "oembed", "ol", "p", "pre", "s", "span", "strong", "sub",
+    "sup", "table", "tbody", "td", "th", "thead", "tr", "u", "ul",
+}
+ALLOWED_ATTRIBUTES = {
+    "a": {"href", "title"},
+    "img": {"src", "alt", "width", "height"},
+    "td": {"colspan", "rowspan"},
+    "th": {"colspan", "rowspan"},
+    "figure": {"class"},
+    "mark": {"class"},
+    "oembed": {"url"},
+    "ol": {"start", "reversed"},
+    "ul": {"class"},
+    "label": {"class"},
+    "span": {"class"},
+    "input": {"type", "checked", "disabled"},
+}
+BOOLEAN_ATTRIBUTES = {"checked", "disabled", "reversed"}
+URL_ATTRIBUTES = {"href", "src", "url"}
+URL_SCHEMES = {"http", "https", "mailto"}
+# Elements without an end tag.
+VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link",
+    "meta", "source", "track", "wbr",
+}
+# Opening one of these closes a sibling of the same tag left open.
+SIBLING_TAGS = {"li", "p", "td", "th", "tr"}
+# Dropped together with everything inside them, void ones just by themselves.
+DROPPED_TAGS = {"script", "style", "iframe", "object", "embed", "template"}
+# Start a new line in the plain text.
+BLOCK_TAGS = {
+    "blockquote", "br", "div", "figcaption", "figure", "h1", "h2", "h3", "h4",
+    "h5", "h6", "hr", "li", "ol", "p", "pre", "table", "tr", "ul",
+}
+
+
+class DescriptionParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.html = []
+        self.text = []
+        self.open_tags = []
+        self.dropped = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROPPED_TAGS:
+            if tag not in VOID_TAGS:
+                self.dropped += 1
+            return
+        if self.dropped:
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append("\n")
+        if tag not in ALLOWED_TAGS:
+            return
+        if tag == "input":
+            # Only the to-do list checkboxes, and readers can't tick them.
+            if dict(attrs).get("type") != "checkbox":
+                return
+            attrs = [*attrs, ("disabled", None)]
+
+        if tag in SIBLING_TAGS and self.open_tags and self.open_tags[-1] == tag:
+            self.html.append(f"</{self.open_tags.pop()}>")
+
+        allowed = ALLOWED_ATTRIBUTES.get(tag, set())
+        rendered = [tag]
+        for name, value in attrs:
+            if name not in allowed or name in rendered:
+                continue
+            if name in BOOLEAN_ATTRIBUTES:
+                rendered.append(name)
+                continue
+            if value is None:
+                continue
+            if name in URL_ATTRIBUTES and not is_safe_url(value):
+                continue
+            rendered.append(f'{name}="{escape(value)}"')
+        self.html.append(f"<{' '.join(rendered)}>")
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and tag not in DROPPED_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROPPED_TAGS:
+            if tag not in VOID_TAGS:
+                self.dropped = max(self.dropped - 1, 0)
+            return
+        if self.dropped:
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append("\n")
+        if tag not in self.open_tags:
+            return
+
+        # Close anything left open inside this tag as well.
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.html.append(f"</{open_tag}>")
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if self.dropped:
+            return
+        self.html.append(escape(data, quote=False))
+        self.text.append(data)
+
+    def close(self):
+        super().close()
+        while self.open_tags:
+            self.html.append(f"</{self.open_tags.pop()}>")
+
+
+def is_safe_url(value):
+    # Browsers ignore whitespace and control characters inside a scheme.
+    value = "".join(char for char in value if char > " ")
+    scheme = urlparse(value).scheme.lower()
+    if scheme:
+        return scheme in URL_SCHEMES
+    return ":" not in value.split("/", 1)[0]
+
+
+def sanitize_description(value):
+    """
+    Return the description as (sanitized HTML, plain text). The text keeps
+    one line per block element.
+    """
+    parser = DescriptionParser()
+    parser.feed(value or "")
+    parser.close()
+
+    lines = (" ".join(line.split()) for line in "".join(parser.text).splitlines())
+    return "".join(parser.html), "\n".join(line for line in lines if line)
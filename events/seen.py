@@ -0,0 +1,215 @@
+import logging
+from itertools import chain
+
+from django.conf import settings
+
+from config import db_router
+from config.redis import get_redis_client
+from events.models import Event, EventView
+
+logger = logging.getLogger(__name__)
+
+TYPES = [choice[0] for choice in Event.TYPE_CHOICES]
+
+# Bit N of a bitmap stands for the event with ordinal N. The catalog of each
+# type has a bit for every existing event, a user's seen-set has a bit for
+# every event they viewed or that was published before they signed up.
+CATALOG_KEY = "events:seen:catalog:{type}"
+GENERATION_KEY = "events:seen:generation"
+SEEN_KEY = "events:seen:user:{user_id}"
+SEEN_GENERATION_KEY = "events:seen:generation:user:{user_id}"
+BITMAP_TIMEOUT = 60 * 60 * 24
+
+# Only touch bitmaps that are already built, a missing one is rebuilt from
+# the database and would otherwise start out with a single bit set.
+SETBIT_IF_EXISTS = """
+if redis.call("exists", KEYS[1]) == 1 then
+    return redis.call("setbit", KEYS[1], ARGV[1], ARGV[2])
+end
+"""
+
+# A bitmap built from the database is only stored if nothing it covers
+# changed while it was being read, or the change could be lost.
+SET_IF_GENERATION = """
+if (redis.call("get", KEYS[1]) or "0") == ARGV[1] then
+    return redis.call("set", KEYS[2], ARGV[2], "NX", "EX", ARGV[3])
+end
+"""
+
+
+def get_client():
+    if not settings.EVENTS_SEEN_BITMAPS:
+        return None
+    return get_redis_client()
+
+
+def to_bitmap(ordinals):
+    ordinals = list(ordinals)
+    bitmap = bytearray(max(ordinals, default=-1) // 8 + 1)
+    for ordinal in ordinals:
+        bitmap[ordinal >> 3] |= 0x80 >> (ordinal & 7)
+    return bytes(bitmap)
+
+
+def to_ordinals(bitmap):
+    ordinals = []
+    for index, byte in enumerate(bitmap):
+        if byte:
+            ordinals.extend(
+                index * 8 + bit for bit in range(8) if byte & (0x80 >> bit)
+            )
+    return ordinals
+
+
+def difference(bitmap, other):
+    size = len(bitmap)
+    other = other[:size].ljust(size, b"\0")
+    value = int.from_bytes(bitmap, "big") & ~int.from_bytes(other, "big")
+    return value.to_bytes(size, "big")
+
+
+def get_catalogs(client):
+    keys = [CATALOG_KEY.format(type=t) for t in TYPES]
+    catalogs = dict(zip(TYPES, client.mget(keys)))
+
+    missing = [t for t in TYPES if catalogs[t] is None]
+    if missing:
+        generation = client.get(GENERATION_KEY) or b"0"
+        ordinals = {t: [] for t in missing}
+        rows = Event.objects.filter(types_event__in=missing).values_list(
+            "types_event", "ordinal"
+        )
+        # Bitmaps outlive replica lag, so they are built from the primary.
+        with db_router.primary():
+            for event_type, ordinal in rows.iterator():
+                ordinals[event_type].append(ordinal)
+
+        script = client.register_script(SET_IF_GENERATION)
+        pipe = client.pipeline()
+        for event_type in missing:
+            catalogs[event_type] = to_bitmap(ordinals[event_type])
+            script(
+                keys=[GENERATION_KEY, CATALOG_KEY.format(type=event_type)],
+                args=[generation, catalogs[event_type], BITMAP_TIMEOUT],
+                client=pipe,
+            )
+        pipe.execute()
+    return catalogs
+
+
+def get_seen(client, user):
+    key = SEEN_KEY.format(user_id=user.id)
+    seen = client.get(key)
+    if seen is None:
+        generation_key = SEEN_GENERATION_KEY.format(user_id=user.id)
+        generation = client.get(generation_key) or b"0"
+        with db_router.primary():
+            seen = read_seen(user)
+        client.register_script(SET_IF_GENERATION)(
+            keys=[generation_key, key], args=[generation, seen, BITMAP_TIMEOUT]
+        )
+    return seen
+
+
+def read_seen(user):
+    viewed = EventView.objects.filter(user=user, is_viewed=True).values_list(
+        "event__ordinal", flat=True
+    )
+    seen_at_signup = Event.objects.filter(
+        created_at__lte=user.created_at
+    ).values_list("ordinal", flat=True)
+    return to_bitmap(chain(viewed.iterator(), seen_at_signup.iterator()))
+
+
+def get_unviewed(client, user):
+    seen = get_seen(client, user)
+    return {
+        event_type: difference(catalog, seen)
+        for event_type, catalog in get_catalogs(client).items()
+    }
+
+
+def unviewed_counts(user):
+    client = get_client()
+    if client is None:
+        return None
+
+    try:
+        unviewed = get_unviewed(client, user)
+    except Exception as e:
+        logger.warning(f"Failed to read seen bitmaps for user {user.id}: {str(e)}")
+        return None
+    return {
+        event_type: int.from_bytes(bitmap, "big").bit_count()
+        for event_type, bitmap in unviewed.items()
+    }
+
+
+def unviewed_events(user):
+    # Small unviewed sets are looked up by ordinal; past the limit the
+    # anti-join in unviewed_by() is cheaper than a huge IN list.
+    client = get_client()
+    if client is not None:
+        try:
+            ordinals = []
+            for bitmap in get_unviewed(client, user).values():
+                ordinals.extend(to_ordinals(bitmap))
+        except Exception as e:
+            logger.warning(f"Failed to read seen bitmaps for user {user.id}: {str(e)}")
+        else:
+            if len(ordinals) <= settings.EVENTS_SEEN_BITMAP_MAX_IDS:
+                return Event.objects.filter(ordinal__in=ordinals)
+
+    return Event.objects.unviewed_by(user)
+
+
+def set_bits(client, bits):
+    script = client.register_script(SETBIT_IF_EXISTS)
+    pipe = client.pipeline()
+    for key, ordinal, value in bits:
+        script(keys=[key], args=[ordinal, value], client=pipe)
+    pipe.execute()
+
+
+def events_viewed(user, events):
+    client = get_client()
+    if client is None:
+        return
+
+    key = SEEN_KEY.format(user_id=user.id)
+    generation_key = SEEN_GENERATION_KEY.format(user_id=user.id)
+    try:
+        # Views committed while the bitmap is being filled may be missing
+        # from it, the new generation keeps that fill from being stored.
+        pipe = client.pipeline()
+        pipe.incr(generation_key)
+        pipe.expire(generation_key, BITMAP_TIMEOUT)
+        pipe.execute()
+        set_bits(client, [(key, event.ordinal, 1) for event in events])
+    except Exception as e:
+        logger.warning(f"Failed to update seen bitmap for user {user.id}: {str(e)}")
+
+
+def event_changed(event, deleted=False):
+    client = get_client()
+    if client is None:
+        return
+
+    # The previous type is unknown here, so the bit is cleared everywhere.
+    bits = [(CATALOG_KEY.format(type=t), event.ordinal, 0) for t in TYPES]
+    if not deleted:
+        bits.append((CATALOG_KEY.format(type=event.types_event), event.ordinal, 1))
+    try:
+        client.incr(GENERATION_KEY)
+        set_bits(client, bits)
+    except Exception as e:
+        logger.warning(f"Failed to update event catalog bitmaps: {str(e)}")
+
+
+def rebuild(client):
+    keys = [CATALOG_KEY.format(type=t) for t in TYPES]
+    keys.extend(client.scan_iter(match=SEEN_KEY.format(user_id="*")))
+    if keys:
+        client.delete(*keys)
+    get_catalogs(client)
+    return len(keys)
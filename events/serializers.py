@@ -2,7 +2,29 @@ from rest_framework import serializers
 
 from events.models import Event, EventView
 
-class EventSerializer(serializers.ModelSerializer):
+class SparseFieldsetMixin:
+    """
+    Limits the output to the fields listed in `?fields=`, e.g.
+    `?fields=event_id,title`. Unknown names are ignored.
+    """
+
+    fields_query_param = "fields"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+        if request is None:
+            return
+
+        requested = request.query_params.get(self.fields_query_param)
+        if requested:
+            allowed = {name.strip() for name in requested.split(",")}
+            for name in set(self.fields) - allowed:
+                self.fields.pop(name)
+
+
+class EventSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    description = serializers.CharField(source="description_html", read_only=True)
     event_view = serializers.SerializerMethodField()
 
     class Meta:
@@ -23,15 +45,55 @@ class EventSerializer(serializers.ModelSerializer):
 
     def get_event_view(self, obj):
         user = self.context.get("request").user
-        
-        try:
-            event_view = obj.views.get(user=user)
-            return EventViewSerializer(event_view).data
-        except EventView.DoesNotExist:
-            return None
+        user_views = getattr(obj, "user_views", None)
+        if user_views is None:
+            user_views = list(obj.views.filter(user=user))
+
+        return event_view_data(
+            user_views[0] if user_views else None, obj.is_seen_at_signup(user)
+        )
+
+
+class EventListSerializer(EventSerializer):
+    """
+    Feed card representation: the excerpt instead of the description HTML.
+    """
+
+    class Meta(EventSerializer.Meta):
+        fields = [
+            "event_id",
+            "title",
+            "excerpt",
+            "image",
+            "deadline",
+            "types_event",
+            "company",
+            "created_at",
+            "event_view",
+        ]
+
+
+def event_view_data(view, seen_at_signup):
+    if view is None:
+        if seen_at_signup:
+            return {"is_viewed": True, "is_liked": False}
+        return None
+
+    data = EventViewSerializer(view).data
+    if seen_at_signup:
+        data["is_viewed"] = True
+    return data
 
 
 class EventViewSerializer(serializers.ModelSerializer):
     class Meta:
         model = EventView
-        fields = ["is_viewed", "is_liked"]
\ No newline at end of file
+        fields = ["is_viewed", "is_liked"]
+
+
+class InteractionSerializer(serializers.Serializer):
+    ACTIONS = ["view", "like", "unlike", "link"]
+
+    event_id = serializers.UUIDField()
+    action = serializers.ChoiceField(choices=ACTIONS)
+    timestamp = serializers.DateTimeField()
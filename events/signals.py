@@ -1,24 +1,95 @@
-from django.db.models.signals import post_save
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
 import logging
 
-from .models import Event
-from events.utils import FirebaseNotificationService
+from . import cache, counters, seen
+from .models import Event, EventStats, NotificationOutbox
 
 logger = logging.getLogger(__name__)
 
 
 @receiver(post_save, sender=Event)
-def send_event_notification(sender, instance, created, **kwargs):
+def enqueue_event_notification(sender, instance, created, **kwargs):
     if created:
-        try:
-            logger.info(
-                f"New event created: {instance.title} (ID: {instance.event_id}), sending notification"
-            )
-            notification_service = FirebaseNotificationService()
-            result = notification_service.send_event_notification(instance)
-            logger.info(f"Notification sending result: {result}")
-        except Exception as e:
-            logger.error(
-                f"Failed to send notification for event {instance.event_id}: {str(e)}"
-            )
+        NotificationOutbox.objects.create(event=instance)
+        logger.info(
+            f"New event created: {instance.title} (ID: {instance.event_id}), notification queued"
+        )
+
+
+@receiver(post_save, sender=Event)
+def create_event_stats(sender, instance, created, **kwargs):
+    if created:
+        EventStats.objects.create(event=instance)
+
+
+@receiver(post_save, sender=Event)
+def update_event_search_vector(sender, instance, **kwargs):
+    instance.update_search_vector()
+
+
+@receiver(post_save, sender=Event)
+def update_unviewed_counts(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: counters.event_created(instance))
+    else:
+        transaction.on_commit(counters.events_changed)
+
+
+@receiver(post_delete, sender=Event)
+def reset_unviewed_counts(sender, instance, **kwargs):
+    transaction.on_commit(counters.events_changed)
+
+
+@receiver(post_save, sender=Event)
+def update_seen_catalog(sender, instance, **kwargs):
+    transaction.on_commit(lambda: seen.event_changed(instance))
+
+
+@receiver(post_delete, sender=Event)
+def remove_from_seen_catalog(sender, instance, **kwargs):
+    transaction.on_commit(lambda: seen.event_changed(instance, deleted=True))
+
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def invalidate_event_lists(sender, instance, **kwargs):
+    transaction.on_commit(cache.events_changed)
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def invalidate_cached_event(sender, instance, **kwargs):
+    # The instance loses its pk once deleted, so it is read right away.
+    event_id = instance.event_id
+    transaction.on_commit(lambda: cache.event_changed(event_id))
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def remove_user_stats(sender, instance, **kwargs):
+    # Runs before the user's EventView rows are deleted by the cascade.
+    EventStats.record_user(instance.pk, instance.type, -1)
+
+
+@receiver(pre_save, sender=settings.AUTH_USER_MODEL)
+def remember_user_type(sender, instance, raw, update_fields, **kwargs):
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and "type" not in update_fields:
+        return
+    saved = sender.objects.filter(pk=instance.pk).values_list("type", flat=True)
+    for old_type in saved:
+        if old_type != instance.type:
+            instance._previous_type = old_type
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def move_user_stats(sender, instance, **kwargs):
+    # The totals stay the same, only the per-type counts move.
+    if "_previous_type" in instance.__dict__:
+        old_type = instance.__dict__.pop("_previous_type")
+        EventStats.record_user(instance.pk, old_type, -1)
+        EventStats.record_user(instance.pk, instance.type, 1)
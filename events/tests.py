@@ -0,0 +1,690 @@
+import base64
+import io
+import json
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+from unittest import mock, skipUnless
+
+from asgiref.sync import sync_to_async
+from django.contrib import admin
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, connection, connections, transaction
+from django.db.models import F
+from django.test import (
+    AsyncRequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from firebase_admin import exceptions as firebase_exceptions
+from firebase_admin import messaging
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from rest_framework_simplejwt.tokens import AccessToken
+
+from config import db_router
+from events import cache as event_cache
+from events import clicks, notifications, seen
+from events.admin import EventAdmin
+from events.async_views import AsyncUnviewedEventsCountAPIView
+from events.models import Event, EventStats, EventView, NotificationOutbox
+from events.utils import FirebaseTransport
+from events.sanitizer import sanitize_description
+from events.views import EventListView
+from monitoring.middleware import MetricsMiddleware
+from users.models import User
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+try:
+    # fakeredis needs it to run the Lua scripts of events.seen.
+    import lupa
+except ImportError:
+    lupa = None
+
+
+class EventTestMixin:
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email="user@example.com", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_events(self, count, types_event="grant"):
+        events = Event.objects.bulk_create(
+            Event(
+                title=f"Event {i}",
+                description="<p>Description</p>",
+                image="events/image.png",
+                deadline="2030-01-01",
+                types_event=types_event,
+                type_url="https://example.com",
+            )
+            for i in range(count)
+        )
+        # Every other event is liked, the rest stay unviewed.
+        EventView.objects.bulk_create(
+            EventView(
+                user=self.user,
+                event=event,
+                is_viewed=True,
+                is_liked=True,
+                liked_at=timezone.now(),
+            )
+            for event in events[::2]
+        )
+        return events
+
+
+class FeedQueryCountTests(EventTestMixin, TestCase):
+    """
+    The number of queries of a feed page must not grow with the number of
+    events or interactions on it.
+    """
+
+    def assertConstantQueries(self, url):
+        self.create_events(2)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["results"])
+
+        self.create_events(30)
+        cache.clear()
+        with self.assertNumQueries(len(queries)):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_event_list(self):
+        self.assertConstantQueries("/api/v1/events/")
+
+    def test_unviewed_events(self):
+        self.assertConstantQueries("/api/v1/events/unviewed/")
+
+    def test_favorite_events(self):
+        self.assertConstantQueries("/api/v1/favorites/")
+
+
+@skipUnless(fakeredis, "fakeredis is not installed")
+class FlushClicksTests(EventTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        server = fakeredis.FakeServer()
+        self.redis = fakeredis.FakeRedis(server=server)
+        patcher = mock.patch("events.clicks.get_redis_client", return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.event = self.create_events(1)[0]
+
+    def test_flush_applies_buffered_clicks(self):
+        for _ in range(3):
+            clicks.record_click(self.event.event_id)
+
+        self.assertEqual(clicks.flush_clicks(), 1)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.click, 3)
+        self.assertFalse(self.redis.exists(clicks.CLICKS_KEY))
+
+    def test_failed_flush_keeps_clicks(self):
+        for _ in range(3):
+            clicks.record_click(self.event.event_id)
+
+        with mock.patch("events.clicks.add_clicks", side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                clicks.flush_clicks()
+        clicks.record_click(self.event.event_id)
+
+        clicks.flush_clicks()
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.click, 4)
+
+
+class EventAdminTests(EventTestMixin, TestCase):
+    def test_save_keeps_flushed_clicks(self):
+        event = self.create_events(1)[0]
+        model_admin = EventAdmin(Event, admin.site)
+        obj = model_admin.get_object(None, event.event_id)
+        # A click flush lands while the change form is open.
+        Event.objects.filter(pk=event.pk).update(click=F("click") + 5)
+
+        obj.title = "Renamed"
+        model_admin.save_model(None, obj, None, change=True)
+        event.refresh_from_db()
+        self.assertEqual((event.title, event.click), ("Renamed", 5))
+
+
+class EventViewMarkTests(EventTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        # The first one is liked and viewed, the second has no row yet.
+        self.liked, self.new = self.create_events(2)
+        self.at = timezone.now() - timedelta(hours=1)
+
+    def mark(self, action, *events):
+        return EventView.objects.mark(
+            self.user, action, {event.event_id: self.at for event in events}
+        )
+
+    def get_view(self, event):
+        return EventView.objects.filter(user=self.user, event=event).first()
+
+    def test_view_and_link(self):
+        for action, flag in (("view", "is_viewed"), ("link", "is_linked")):
+            with self.subTest(action=action):
+                changed = self.mark(action, self.new)
+                self.assertEqual(changed, {self.new.event_id: True})
+                self.assertTrue(getattr(self.get_view(self.new), flag))
+                changed = self.mark(action, self.new)
+                self.assertEqual(changed, {self.new.event_id: False})
+
+        view = self.get_view(self.new)
+        self.assertEqual((view.is_liked, view.liked_at), (False, None))
+
+    def test_like(self):
+        changed = self.mark("like", self.liked, self.new)
+        self.assertEqual(
+            changed, {self.liked.event_id: False, self.new.event_id: True}
+        )
+        view = self.get_view(self.new)
+        self.assertEqual((view.is_liked, view.is_viewed), (True, False))
+        self.assertEqual(view.liked_at, self.at)
+        # Liking again keeps the time of the first like.
+        self.assertNotEqual(self.get_view(self.liked).liked_at, self.at)
+
+    def test_unlike(self):
+        changed = self.mark("unlike", self.liked, self.new)
+        self.assertEqual(
+            changed, {self.liked.event_id: True, self.new.event_id: False}
+        )
+        view = self.get_view(self.liked)
+        self.assertEqual((view.is_liked, view.is_viewed), (False, True))
+        # Nothing to unlike, so no row is created.
+        self.assertIsNone(self.get_view(self.new))
+        self.assertEqual(self.mark("unlike", self.liked), {self.liked.event_id: False})
+
+    def test_missing_event(self):
+        missing = Event(event_id=uuid.uuid4())
+        for action in ("view", "like", "link", "unlike"):
+            with self.subTest(action=action):
+                changed = self.mark(action, self.new, missing)
+                self.assertEqual(list(changed), [self.new.event_id])
+        self.assertFalse(EventView.objects.filter(event_id=missing.event_id).exists())
+
+
+class InteractionsBatchTests(EventTestMixin, TestCase):
+    url = "/api/v1/events/interactions/batch/"
+
+    def setUp(self):
+        super().setUp()
+        # The first one is liked and viewed, the second has no row yet.
+        self.liked, self.new = self.create_events(2)
+        EventStats.rebuild()
+        self.at = timezone.now() - timedelta(hours=1)
+
+    def item(self, event, action, minutes=0):
+        at = self.at + timedelta(minutes=minutes)
+        return {"event_id": str(event.event_id), "action": action, "timestamp": at}
+
+    def post(self, items):
+        response = self.client.post(self.url, items, format="json")
+        self.assertEqual(response.status_code, 200)
+        return [result["status"] for result in response.json()["results"]]
+
+    def get_stats(self, event):
+        return EventStats.objects.values_list(
+            "views_total", "likes_total", "links_total"
+        ).get(event=event)
+
+    def test_retry_is_idempotent(self):
+        items = [
+            self.item(self.new, "view"),
+            self.item(self.new, "like"),
+            self.item(self.new, "link"),
+            self.item(self.new, "view", minutes=1),
+        ]
+        self.assertEqual(self.post(items), ["applied"] * 4)
+        self.assertEqual(self.get_stats(self.new), (1, 1, 1))
+
+        self.assertEqual(self.post(items), ["unchanged"] * 4)
+        self.assertEqual(self.get_stats(self.new), (1, 1, 1))
+
+    def test_latest_of_like_and_unlike_wins(self):
+        statuses = self.post(
+            [
+                self.item(self.liked, "like", minutes=1),
+                self.item(self.liked, "unlike", minutes=2),
+                self.item(self.liked, "like"),
+                self.item(self.new, "unlike"),
+                self.item(self.new, "like", minutes=1),
+            ]
+        )
+        self.assertEqual(
+            statuses, ["superseded", "applied", "superseded", "superseded", "applied"]
+        )
+        self.assertEqual(self.get_stats(self.liked)[1], 0)
+        self.assertEqual(self.get_stats(self.new)[1], 1)
+        liked = EventView.objects.filter(user=self.user, is_liked=True)
+        self.assertEqual(list(liked.values_list("event_id", flat=True)), [self.new.pk])
+
+    def test_invalid_and_missing_items(self):
+        statuses = self.post(
+            [
+                {"event_id": str(self.new.event_id), "action": "share"},
+                self.item(Event(event_id=uuid.uuid4()), "view"),
+                self.item(self.new, "view"),
+            ]
+        )
+        self.assertEqual(statuses, ["invalid", "not_found", "applied"])
+
+
+class EventStatsTests(EventTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user.type = "student"
+        self.user.save()
+        self.other = User.objects.create_user(email="other@example.com", type="school")
+        events = self.create_events(4)
+        EventView.objects.bulk_create(
+            EventView(user=self.other, event=event, is_viewed=True, is_linked=True)
+            for event in events[:3]
+        )
+        EventStats.rebuild()
+
+    def assertStatsRebuilt(self):
+        fields = EventStats.counter_fields()
+        stats = list(EventStats.objects.order_by("event_id").values_list(*fields))
+        EventStats.rebuild()
+        rebuilt = list(EventStats.objects.order_by("event_id").values_list(*fields))
+        self.assertEqual(stats, rebuilt)
+
+    def test_user_deleted(self):
+        self.other.delete()
+        self.assertStatsRebuilt()
+        self.assertEqual(EventStats.objects.filter(links_total__gt=0).count(), 0)
+
+    def test_user_type_changed(self):
+        self.user.type = "other"
+        self.user.save()
+        self.assertStatsRebuilt()
+        self.assertEqual(EventStats.objects.filter(likes_other=1).count(), 2)
+
+
+@override_settings(FCM_MAX_WORKERS=3)
+class FirebaseTransportTests(SimpleTestCase):
+    def test_concurrency_is_bounded(self):
+        lock = threading.Lock()
+        active = peak = 0
+
+        def send(message):
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.01)
+            with lock:
+                active -= 1
+            if message.token == "stale":
+                raise firebase_exceptions.NotFoundError("Unregistered")
+            return f"projects/p/messages/{message.token}"
+
+        # Skips initializing the Firebase app.
+        transport = FirebaseTransport.__new__(FirebaseTransport)
+        tokens = [f"token-{i}" for i in range(20)] + ["stale"]
+        with mock.patch("events.utils.messaging.send", side_effect=send):
+            response = transport.send_multicast(
+                messaging.MulticastMessage(tokens=tokens)
+            )
+        self.assertEqual(peak, 3)
+        self.assertEqual((response.success_count, response.failure_count), (20, 1))
+
+
+@override_settings(NOTIFICATION_MAX_ATTEMPTS=3)
+class ClaimNotificationsTests(EventTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.event = self.create_events(1)[0]
+
+    def test_expired_lease_is_claimed_again(self):
+        job = NotificationOutbox.objects.create(
+            event=self.event, status="processing", attempts=1
+        )
+        claimed = notifications.claim_notifications(10)
+        self.assertEqual([claimed_job.pk for claimed_job in claimed], [job.pk])
+
+    def test_broadcast_failing_for_every_token_is_retried(self):
+        NotificationOutbox.objects.create(event=self.event)
+        job = notifications.claim_notifications(10)[0]
+        service = mock.Mock(initialized=True)
+        service.send_event_notification.return_value = {
+            "success": 0,
+            "failure": 2,
+            "responses": [{"success": False, "error": "Service unavailable"}] * 2,
+        }
+        with mock.patch(
+            "events.notifications.FirebaseNotificationService", return_value=service
+        ):
+            notifications.deliver_notification(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, "pending")
+        self.assertGreater(job.next_attempt_at, timezone.now())
+        self.assertIn("Service unavailable", job.last_error)
+
+    def test_job_out_of_attempts_fails(self):
+        # Its worker was killed on every attempt, the lease ran out each time.
+        job = NotificationOutbox.objects.create(
+            event=self.event, status="processing", attempts=3
+        )
+        self.assertEqual(notifications.claim_notifications(10), [])
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+
+
+class EventFeedPaginationTests(EventTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.create_events(120)
+
+    def test_tampered_cursor(self):
+        cursor = base64.urlsafe_b64encode(json.dumps(["abc", "def"]).encode())
+        response = self.client.get(
+            "/api/v1/events/", {"cursor": cursor.decode(), "compact": "true"}
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_cursor_pages_are_capped(self):
+        response = self.client.get(
+            "/api/v1/events/",
+            {"pagination": "cursor", "limit": 500, "compact": "true"},
+        )
+        self.assertEqual(len(response.json()["results"]), 100)
+
+    def test_offset_pages_are_not_capped(self):
+        response = self.client.get(
+            "/api/v1/events/", {"limit": 500, "compact": "true"}
+        )
+        self.assertEqual(len(response.json()["results"]), 120)
+
+
+@skipUnless(connection.vendor == "postgresql", "EXPLAIN plans are PostgreSQL's")
+class EventListOrderingPlanTests(EventTestMixin, TestCase):
+    """
+    Every ordering mode, with and without a type filter, reads the first
+    page straight from an index instead of sorting the table.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        types = [choice[0] for choice in Event.TYPE_CHOICES]
+        Event.objects.bulk_create(
+            Event(
+                title=f"Event {i}",
+                description="<p>Description</p>",
+                image="events/image.png",
+                deadline=date(2030, 1, 1) + timedelta(days=i % 365),
+                types_event=types[i % len(types)],
+                type_url="https://example.com",
+                click=i % 97,
+            )
+            for i in range(2000)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE events_event")
+
+    def get_plan(self, params):
+        request = APIRequestFactory().get("/api/v1/events/", params)
+        force_authenticate(request, user=self.user)
+        view = EventListView()
+        view.setup(request)
+        view.request = view.initialize_request(request)
+        view.format_kwarg = None
+        queryset = view.filter_queryset(view.get_queryset())
+        # Plans for an almost empty table are not meaningful, and small
+        # tables still tempt the planner into a sequential scan.
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        return queryset[:8].explain()
+
+    def test_orderings_use_indexes(self):
+        modes = {
+            "newest": ("event_created_idx", "event_type_created_idx"),
+            "deadline": ("event_deadline_idx", "event_type_deadline_idx"),
+            "popular": ("event_click_idx", "event_type_click_idx"),
+            "title": ("event_title_idx", "event_type_title_idx"),
+        }
+        for ordering, (index, type_index) in modes.items():
+            for params, expected in (
+                ({"ordering": ordering}, index),
+                ({"ordering": ordering, "types_event": "grant"}, type_index),
+            ):
+                with self.subTest(**params):
+                    plan = self.get_plan(params)
+                    self.assertIn(f"Index Scan using {expected}", plan)
+                    self.assertNotIn("Sort", plan)
+
+
+@skipUnless(fakeredis and lupa, "fakeredis[lua] is not installed")
+@override_settings(EVENTS_SEEN_BITMAPS=True)
+class SeenBitmapTests(EventTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.redis = fakeredis.FakeRedis(server=fakeredis.FakeServer())
+        patcher = mock.patch("events.seen.get_redis_client", return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.event = self.create_events(2)[1]
+
+    def test_view_during_fill_is_not_lost(self):
+        read_seen = seen.read_seen
+
+        def read_then_view(user):
+            bitmap = read_seen(user)
+            # A detail view commits and updates the bitmaps right after
+            # the fill has read the database.
+            EventView.objects.mark(
+                user, "view", {self.event.event_id: timezone.now()}
+            )
+            seen.events_viewed(user, [self.event])
+            return bitmap
+
+        with mock.patch("events.seen.read_seen", side_effect=read_then_view):
+            seen.get_seen(self.redis, self.user)
+        self.assertFalse(self.redis.exists(seen.SEEN_KEY.format(user_id=self.user.id)))
+
+        bitmap = seen.get_seen(self.redis, self.user)
+        self.assertIn(self.event.ordinal, seen.to_ordinals(bitmap))
+        self.assertEqual(
+            self.redis.get(seen.SEEN_KEY.format(user_id=self.user.id)), bitmap
+        )
+
+
+class DescriptionTests(EventTestMixin, TestCase):
+    def test_void_dropped_tag_keeps_the_rest(self):
+        html, text = sanitize_description('<p>a</p><embed src="x"><p>after</p>')
+        self.assertEqual(html, "<p>a</p><p>after</p>")
+        self.assertEqual(text, "a\nafter")
+
+    def test_editor_media_and_todo_lists(self):
+        html, _ = sanitize_description(
+            '<figure class="media"><oembed url="https://youtu.be/x"></oembed></figure>'
+            '<ul class="todo-list"><li><label class="todo-list__label">'
+            '<input type="checkbox" checked="checked"> Done</label></li></ul>'
+        )
+        self.assertIn('<oembed url="https://youtu.be/x"></oembed>', html)
+        self.assertIn('<input type="checkbox" checked disabled>', html)
+
+    def test_backfill_refreshes_cached_event(self):
+        event = self.create_events(1)[0]
+        self.assertEqual(event_cache.get_event(event.event_id).description_html, "")
+
+        call_command("backfill_event_descriptions", stdout=io.StringIO())
+        self.assertEqual(
+            event_cache.get_event(event.event_id).description_html,
+            "<p>Description</p>",
+        )
+
+
+@override_settings(EVENTS_CONDITIONAL_REQUESTS=True)
+class ConditionalRequestTests(EventTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.event = self.create_events(8)[1]
+
+    def test_feed_not_modified(self):
+        urls = ("/api/v1/events/", "/api/v1/events/unviewed/", "/api/v1/favorites/")
+        for url in urls:
+            with self.subTest(url=url):
+                etag = self.client.get(url)["ETag"]
+                with self.assertNumQueries(0):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+    def test_feed_changes_with_interactions(self):
+        etag = self.client.get("/api/v1/favorites/")["ETag"]
+        query = f"?event_id={self.event.event_id}"
+        self.client.delete(f"/api/v1/favorites/remove/{query}")
+        self.client.post(f"/api/v1/favorites/add/{query}")
+        response = self.client.get("/api/v1/favorites/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    @skipUnless(fakeredis, "fakeredis is not installed")
+    def test_detail_not_modified(self):
+        # Clicks are buffered in Redis instead of updating the row.
+        redis = fakeredis.FakeRedis(server=fakeredis.FakeServer())
+        url = f"/api/v1/events/{self.event.event_id}/"
+        with mock.patch("events.clicks.get_redis_client", return_value=redis):
+            etag = self.client.get(url)["ETag"]
+            # Only the upsert marking the event as viewed.
+            with self.assertNumQueries(1):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(EVENTS_CONDITIONAL_REQUESTS=False)
+    def test_disabled_without_shared_cache(self):
+        response = self.client.get("/api/v1/events/")
+        self.assertNotIn("ETag", response)
+        response = self.client.get(f"/api/v1/events/{self.event.event_id}/")
+        self.assertNotIn("ETag", response)
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(METRICS_SERVER_TIMING=True)
+class AsyncUnviewedCountTests(EventTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        # Three of them are liked, i.e. viewed.
+        self.create_events(5)
+
+    async def get_counts(self):
+        request = AsyncRequestFactory().get("/api/v1/events/unviewed_count/")
+        force_authenticate(request, user=self.user)
+        view = MetricsMiddleware(AsyncUnviewedEventsCountAPIView.as_view())
+        response = await view(request)
+        response.render()
+        return response
+
+    async def test_counts(self):
+        for count_cache in (False, True):
+            with self.subTest(count_cache=count_cache):
+                with self.settings(EVENTS_UNVIEWED_COUNT_CACHE=count_cache):
+                    await cache.aclear()
+                    response = await self.get_counts()
+                self.assertEqual(json.loads(response.content)["grant"], 2)
+
+    async def test_queries_are_timed(self):
+        with self.settings(EVENTS_UNVIEWED_COUNT_CACHE=False):
+            response = await self.get_counts()
+        self.assertIn('desc="1 queries"', response["Server-Timing"])
+
+
+class AsyncEventCacheTests(EventTestMixin, TestCase):
+    async def test_aget_event(self):
+        event = (await sync_to_async(self.create_events)(1))[0]
+        cached = await event_cache.aget_event(event.event_id)
+        self.assertEqual(cached.title, event.title)
+
+        key = event_cache.EVENT_KEY.format(event_id=event.event_id)
+        self.assertEqual(event_cache.local_events.get(key).pk, event.pk)
+        self.assertIsNot(await event_cache.aget_event(event.event_id), cached)
+        with self.assertRaises(Event.DoesNotExist):
+            await event_cache.aget_event(uuid.uuid4())
+
+
+class ReplicaRoutingTests(EventTestMixin, TransactionTestCase):
+    """
+    A second connection to the test database stands in for the replica.
+    Rows have to be committed for it to see them, hence TransactionTestCase.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        replica = {db_router.REPLICA: connections.settings[db_router.PRIMARY]}
+        patcher = mock.patch.dict(connections.settings, replica)
+        patcher.start()
+        cls.addClassCleanup(patcher.stop)
+        cls.addClassCleanup(connections.__delitem__, db_router.REPLICA)
+        cls.addClassCleanup(connections[db_router.REPLICA].close)
+        cls.databases = {db_router.PRIMARY, db_router.REPLICA}
+        super().setUpClass()
+
+    def setUp(self):
+        patcher = mock.patch("config.db_router.replica_enabled", return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        token = db_router.use_primary.get()
+        self.addCleanup(db_router.use_primary.set, token)
+        super().setUp()
+        self.event = self.create_events(2)[1]
+        # The pin is applied by the JWT authentication, not force_authenticate.
+        self.authenticate(self.user)
+        # The fixtures above were written to the primary.
+        db_router.use_primary.set(False)
+
+    def authenticate(self, user):
+        self.client.force_authenticate(None)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+
+    def replica_queries(self, url, method="get"):
+        with CaptureQueriesContext(connections[db_router.REPLICA]) as queries:
+            response = getattr(self.client, method)(url)
+        self.assertLess(response.status_code, 300)
+        return len(queries)
+
+    def test_reads_go_to_the_replica(self):
+        self.assertEqual(Event.objects.all().db, db_router.REPLICA)
+        self.assertGreater(self.replica_queries("/api/v1/favorites/"), 0)
+
+    def test_atomic_block_reads_primary(self):
+        with transaction.atomic():
+            self.assertEqual(Event.objects.all().db, db_router.PRIMARY)
+
+    def test_mark_pins_user(self):
+        EventView.objects.mark(self.user, "like", {self.event.event_id: timezone.now()})
+        self.assertEqual(Event.objects.all().db, db_router.PRIMARY)
+        self.assertTrue(cache.get(db_router.PIN_KEY.format(user_id=self.user.pk)))
+
+    def test_unsafe_request_pins_user(self):
+        add = f"/api/v1/favorites/add/?event_id={self.event.event_id}"
+        self.assertEqual(self.replica_queries(add, "post"), 0)
+        # The user reads their own writes on the following requests.
+        self.assertEqual(self.replica_queries("/api/v1/favorites/"), 0)
+
+        other = User.objects.create_user(email="other@example.com", password="x")
+        self.authenticate(other)
+        self.assertGreater(self.replica_queries("/api/v1/favorites/"), 0)
+
+    @override_settings(EVENTS_LIST_CACHE_TIMEOUT=60, EVENTS_CONDITIONAL_REQUESTS=False)
+    def test_list_page_fill_reads_primary(self):
+        self.assertEqual(self.replica_queries("/api/v1/events/"), 0)
+
+    @override_settings(EVENTS_CONDITIONAL_REQUESTS=True)
+    def test_feed_with_validators_reads_primary(self):
+        self.assertEqual(self.replica_queries("/api/v1/favorites/"), 0)
@@ -1,13 +1,49 @@
 import firebase_admin
 from django.contrib.auth import get_user_model
-from firebase_admin import credentials, messaging
+from firebase_admin import credentials, exceptions, messaging
 from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+from concurrent.futures import ThreadPoolExecutor
 import logging
 
+from monitoring import metrics
+
 logger = logging.getLogger(__name__)
 
 User = get_user_model()
 
+FCM_MULTICAST_LIMIT = 500
+
+
+class FirebaseTransport:
+    def __init__(self):
+        cred_path = getattr(settings, "FIREBASE_CREDENTIALS_PATH", None)
+        if not cred_path:
+            raise ImproperlyConfigured("FIREBASE_CREDENTIALS_PATH not set in settings")
+
+        cred = credentials.Certificate(cred_path)
+        firebase_admin.initialize_app(cred)
+
+    def send_multicast(self, message):
+        # send_each_for_multicast() starts a thread per token, up to 500 per
+        # call. Sending each token from a pool keeps FCM_MAX_WORKERS the limit.
+        messages = [
+            messaging.Message(
+                data=message.data, notification=message.notification, token=token
+            )
+            for token in message.tokens
+        ]
+        max_workers = min(settings.FCM_MAX_WORKERS, len(messages))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return messaging.BatchResponse(list(executor.map(self.send, messages)))
+
+    def send(self, message):
+        try:
+            return messaging.SendResponse({"name": messaging.send(message)}, None)
+        except exceptions.FirebaseError as e:
+            return messaging.SendResponse(None, e)
+
 
 class FirebaseNotificationService:
     _instance = None
@@ -21,18 +57,16 @@ class FirebaseNotificationService:
     def __init__(self):
         if not self._initialized:
             try:
-                cred_path = getattr(settings, "FIREBASE_CREDENTIALS_PATH", None)
-                if not cred_path:
-                    logger.error("FIREBASE_CREDENTIALS_PATH not set in settings")
-                    return
-
-                cred = credentials.Certificate(cred_path)
-                firebase_admin.initialize_app(cred)
+                self.transport = import_string(settings.FCM_TRANSPORT)()
                 self._initialized = True
                 logger.info("Firebase notification service initialized")
             except Exception as e:
                 logger.error(f"Failed to initialize Firebase: {str(e)}")
 
+    @property
+    def initialized(self):
+        return self._initialized
+
     def send_notification(self, title, body, tokens, data=None):
         if not self._initialized:
             logger.error("Firebase not initialized, cannot send notification")
@@ -43,34 +77,56 @@ class FirebaseNotificationService:
             return {"success": 0, "failure": 0}
 
         notification = messaging.Notification(title=title, body=body)
+        batches = [
+            tokens[i : i + FCM_MULTICAST_LIMIT]
+            for i in range(0, len(tokens), FCM_MULTICAST_LIMIT)
+        ]
 
         results = {"success": 0, "failure": 0, "responses": []}
 
-        for token in tokens:
-            message = messaging.Message(
-                notification=notification, token=token, data=data
-            )
-
-            try:
-                response = messaging.send(message)
-                results["success"] += 1
-                results["responses"].append({"success": True, "message_id": response})
-                logger.info(f"Notification sent to token {token[:10]}...")
-            except Exception as e:
-                results["failure"] += 1
-                results["responses"].append({"success": False, "error": str(e)})
-                logger.error(
-                    f"Failed to send notification to token {token[:10]}...: {str(e)}"
-                )
+        # One batch at a time, the transport sends each of them concurrently.
+        for batch in batches:
+            responses = self._send_batch(notification, batch, data)
+            for token, response in zip(batch, responses):
+                if response["success"]:
+                    results["success"] += 1
+                else:
+                    results["failure"] += 1
+                    logger.error(
+                        f"Failed to send notification to token {token[:10]}...: {response['error']}"
+                    )
+                results["responses"].append(response)
 
         logger.info(
             f"Total notifications: {results['success']} successful, {results['failure']} failed"
         )
         return results
 
+    def _send_batch(self, notification, tokens, data):
+        message = messaging.MulticastMessage(
+            tokens=tokens, notification=notification, data=data
+        )
+
+        try:
+            with metrics.timed("fcm"):
+                batch_response = self.transport.send_multicast(message)
+        except Exception as e:
+            return [{"success": False, "error": str(e)} for _ in tokens]
+
+        logger.info(
+            f"Notification batch sent: {batch_response.success_count} successful, "
+            f"{batch_response.failure_count} failed"
+        )
+        return [
+            {"success": True, "message_id": response.message_id}
+            if response.success
+            else {"success": False, "error": str(response.exception)}
+            for response in batch_response.responses
+        ]
+
     def send_event_notification(self, event, tokens=None):
         title = "Новое событие"
-        body = event.title
+        body = "\n".join(filter(None, [event.title, event.excerpt]))
 
         data = {
             "event_id": str(event.event_id),
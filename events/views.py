@@ -1,23 +1,107 @@
+import uuid
+
+from django.db import transaction
+from django.http import Http404
+from django.db.models import F
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from django.contrib.auth import get_user_model
-from events.models import Event, EventView
+from django.conf import settings
+from config import db_router
+from events import cache, counters, seen
+from events.clicks import record_click
+from events.models import Event, EventStats, EventView
+from events.pagination import EventFeedPagination
 from rest_framework.response import Response
-from events.serializers import EventSerializer
+from events.serializers import (
+    EventListSerializer,
+    EventSerializer,
+    InteractionSerializer,
+)
 from rest_framework import generics, status
+from rest_framework.exceptions import ValidationError
 from rest_framework.views import APIView
 from users.permissions import IsAuthenticated
 
 User = get_user_model()
 
-class ListFavoriteEventsAPIView(generics.ListAPIView):
+
+def parse_event_id(value):
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return None
+
+
+class EventFeedMixin:
+    """
+    `?compact=true` returns feed cards with a plain-text excerpt instead of
+    the full description HTML, which is then not loaded at all.
+    """
+
+    unused_fields = ("search_vector", "description", "description_text")
+
+    compact_query_param = "compact"
+
+    def is_compact(self):
+        value = self.request.query_params.get(self.compact_query_param, "")
+        return value.lower() == "true"
+
+    def get_serializer_class(self):
+        return EventListSerializer if self.is_compact() else EventSerializer
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset).defer(*self.unused_fields)
+        if self.is_compact():
+            queryset = queryset.defer("description_html")
+        return queryset
+
+    def get_validator_keys(self):
+        return []
+
+    def list(self, request, *args, **kwargs):
+        if not settings.EVENTS_CONDITIONAL_REQUESTS:
+            return self.list_page(request, *args, **kwargs)
+
+        # A feed only changes with the events or the user's own interactions,
+        # both tracked as versions, so a repeat request is answered with 304
+        # before any query runs.
+        etag, last_modified = cache.list_validators(
+            request, *self.get_validator_keys()
+        )
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if not_modified is not None:
+            return not_modified
+
+        # The body must be at least as new as the validators sent with it, a
+        # lagging replica would pair the new ETag with a stale page and the
+        # client would keep getting 304 for it.
+        with db_router.primary():
+            response = self.list_page(request, *args, **kwargs)
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    def list_page(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+
+class ListFavoriteEventsAPIView(EventFeedMixin, generics.ListAPIView):
     serializer_class = EventSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = EventFeedPagination
 
     def get_queryset(self):
         user = self.request.user
 
-        return Event.objects.filter(views__user=user, views__is_liked=True).order_by(
-            "-views__liked_at"
+        return (
+            Event.objects.filter(views__user=user, views__is_liked=True)
+            .annotate(liked_at=F("views__liked_at"))
+            .order_by("-liked_at", "-event_id")
+            .with_user_views(user)
         )
     
     def get_serializer_context(self):
@@ -38,22 +122,23 @@ class AddFavoriteEventAPIView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        try:
-            event = Event.objects.get(event_id=event_id)
-        except Event.DoesNotExist:
+        event_id = parse_event_id(event_id)
+        changed = {}
+        if event_id:
+            changed = EventView.objects.mark(user, "like", {event_id: timezone.now()})
+        if event_id not in changed:
             return Response(
                 {"error": "Event не найден"}, status=status.HTTP_404_NOT_FOUND
             )
 
-        if EventView.objects.filter(user=user, event=event, is_liked=True).exists():
+        if not changed[event_id]:
             return Response(
                 {"error": "Event уже в избранном"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        EventView.objects.update_or_create(
-            user=user, event=event, defaults={"is_liked": True, "liked_at": timezone.now()}
-        )
+        EventStats.record(event_id, user.type, likes=1)
+        cache.interactions_changed(user)
 
         return Response(
             {"success": "Event успешно добавлен в избранное"},
@@ -73,46 +158,42 @@ class RemoveFavoriteEventAPIView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        try:
-            event = Event.objects.get(event_id=event_id)
-        except Event.DoesNotExist:
+        event_id = parse_event_id(event_id)
+        changed = {}
+        if event_id:
+            changed = EventView.objects.mark(user, "unlike", {event_id: timezone.now()})
+        if event_id not in changed:
             return Response(
                 {"error": "Event не найден"}, status=status.HTTP_404_NOT_FOUND
             )
 
-        try:
-            event_view = EventView.objects.get(user=user, event=event)
-        except EventView.DoesNotExist:
-            return Response(
-                {"error": "Event не был в избранном"},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-
-        if not event_view.is_liked:
+        if not changed[event_id]:
             return Response(
                 {"error": "Event не был в избранном"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        event_view.is_liked = False
-        event_view.save()
+        EventStats.record(event_id, user.type, likes=-1)
+        cache.interactions_changed(user)
 
         return Response(
             {"success": "Event успешно удален из избранного"},
             status=status.HTTP_200_OK,
         )
         
-class UnviewedEventsAPIView(generics.ListAPIView):
+class UnviewedEventsAPIView(EventFeedMixin, generics.ListAPIView):
     serializer_class = EventSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = EventFeedPagination
 
     def get_queryset(self):
         user = self.request.user
 
-        viewed_events = EventView.objects.filter(user=user, is_viewed=True).values_list(
-            "event__event_id", flat=True
+        return (
+            seen.unviewed_events(user)
+            .order_by("-created_at", "-event_id")
+            .with_user_views(user)
         )
-        return Event.objects.exclude(event_id__in=viewed_events)
     
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -125,68 +206,255 @@ class EventLinkTrackView(APIView):
     def post(self, request, event_id):
         user = request.user
 
-        try:
-            event = Event.objects.get(event_id=event_id)
-        except Event.DoesNotExist:
+        changed = EventView.objects.mark(user, "link", {event_id: timezone.now()})
+        if event_id not in changed:
             return Response(
                 {"error": "Событие не найдено."},
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        event_view, _ = EventView.objects.get_or_create(user=user, event=event)
-        if not event_view.is_linked:
-            event_view.is_linked = True
-            event_view.save(update_fields=["is_linked"])
+        if changed[event_id]:
+            EventStats.record(event_id, user.type, links=1)
+            cache.interactions_changed(user)
 
         return Response(
             {"message": "Переход по ссылке зафиксирован."},
             status=status.HTTP_200_OK,
         )
 
+class EventInteractionsBatchAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    max_items = 500
+
+    # like and unlike of the same event collapse into one "favorite"
+    # interaction, the one with the latest timestamp wins.
+    groups = {"view": "view", "like": "favorite", "unlike": "favorite", "link": "link"}
+    stats = {
+        "view": {"views": 1},
+        "like": {"likes": 1},
+        "unlike": {"likes": -1},
+        "link": {"links": 1},
+    }
+
+    def post(self, request):
+        user = request.user
+        items = request.data
+
+        if not isinstance(items, list):
+            return Response(
+                {"error": "Ожидается список взаимодействий"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(items) > self.max_items:
+            return Response(
+                {"error": f"Не более {self.max_items} взаимодействий за запрос"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        results = []
+        winners = {}
+        now = timezone.now()
+        for index, item in enumerate(items):
+            serializer = InteractionSerializer(data=item)
+            if not serializer.is_valid():
+                results.append({"status": "invalid", "errors": serializer.errors})
+                continue
+
+            data = serializer.validated_data
+            data["timestamp"] = min(data["timestamp"], now)
+            results.append(
+                {"event_id": data["event_id"], "action": data["action"]}
+            )
+            key = (data["event_id"], self.groups[data["action"]])
+            winner = winners.get(key)
+            if winner is None or data["timestamp"] >= winner["timestamp"]:
+                winners[key] = data
+
+        by_action = {}
+        for (event_id, _), data in winners.items():
+            by_action.setdefault(data["action"], {})[event_id] = data["timestamp"]
+
+        with transaction.atomic():
+            changed = {
+                action: EventView.objects.mark(user, action, action_items)
+                for action, action_items in by_action.items()
+            }
+
+            deltas = {}
+            for action, action_changed in changed.items():
+                for event_id, is_changed in action_changed.items():
+                    if not is_changed:
+                        continue
+                    event_deltas = deltas.setdefault(event_id, {})
+                    for metric, delta in self.stats[action].items():
+                        event_deltas[metric] = event_deltas.get(metric, 0) + delta
+            for event_id, event_deltas in deltas.items():
+                EventStats.record(event_id, user.type, **event_deltas)
+            if deltas:
+                transaction.on_commit(lambda: cache.interactions_changed(user))
+
+            viewed = [
+                event_id
+                for event_id, is_changed in changed.get("view", {}).items()
+                if is_changed
+            ]
+            if viewed:
+                events = Event.objects.filter(event_id__in=viewed).only(
+                    "types_event", "created_at", "ordinal"
+                )
+                transaction.on_commit(
+                    lambda: counters.events_viewed(user, list(events))
+                )
+
+        for result in results:
+            if "action" not in result:
+                continue
+            event_id, action = result["event_id"], result["action"]
+            winner = winners[(event_id, self.groups[action])]
+            if winner["action"] != action:
+                result["status"] = "superseded"
+            elif event_id not in changed[action]:
+                result["status"] = "not_found"
+            elif changed[action][event_id]:
+                result["status"] = "applied"
+            else:
+                result["status"] = "unchanged"
+
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
 class EventDetailAPIView(generics.RetrieveAPIView):
     permission_classes = [IsAuthenticated]
     queryset = Event.objects.all()
     serializer_class = EventSerializer
     lookup_field = "event_id"
 
+    def get_object(self):
+        try:
+            event = cache.get_event(self.kwargs[self.lookup_field])
+        except Event.DoesNotExist:
+            raise Http404
+        self.check_object_permissions(self.request, event)
+        return event
+
     def get(self, request, *args, **kwargs):
-        user = request.user
-        event = self.get_object()
-        event.click += 1
-        event.save()
+        return self.respond(request, self.get_object())
 
-        try:
-            event_view = EventView.objects.get(user=user, event=event)
-            event_view.is_viewed = True
-            event_view.save()
-        except EventView.DoesNotExist:
-            EventView.objects.create(user=user, event=event, is_viewed=True)
+    def respond(self, request, event):
+        user = request.user
+        record_click(event.event_id)
 
+        changed = EventView.objects.mark(
+            user, "view", {event.event_id: timezone.now()}
+        )
+        if changed.get(event.event_id):
+            counters.event_viewed(user, event)
+            EventStats.record(event.event_id, user.type, views=1)
+            cache.interactions_changed(user)
 
         serializer = self.get_serializer(
             event, context={"request": request, "user_id": user.id}
         )
-        return Response(serializer.data)
+        if not settings.EVENTS_CONDITIONAL_REQUESTS:
+            return Response(serializer.data)
+
+        etag, last_modified = cache.event_validators(request, event)
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if not_modified is not None:
+            return not_modified
 
-class EventListView(generics.ListAPIView):
+        response = Response(serializer.data)
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        return response
+
+class EventListView(EventFeedMixin, generics.ListAPIView):
     permission_classes = [IsAuthenticated]
     queryset = Event.objects.all()
     serializer_class = EventSerializer
+    pagination_class = EventFeedPagination
+
+    # Every mode is backed by an index on the same columns, with and
+    # without a leading types_event, see Event.Meta.indexes.
+    ordering_modes = {
+        "newest": ("-created_at", "-event_id"),
+        "deadline": ("deadline", "event_id"),
+        "popular": ("-click", "-event_id"),
+        "title": ("title", "event_id"),
+        "relevance": ("-rank", "-similarity", "-created_at", "-event_id"),
+    }
+    ordering_aliases = {
+        "-created_at": "newest",
+        "deadline": "deadline",
+        "-click": "popular",
+        "title": "title",
+    }
 
     def get_queryset(self):
         queryset = Event.objects.all()
+        params = self.request.query_params
 
-        query = self.request.query_params.get("query", None)
+        query = params.get("query", None)
         if query:
-            queryset = queryset.filter(title__icontains=query)
+            queryset = queryset.search(query)
 
-        types_event = self.request.query_params.get("types_event", None)
+        types_event = params.get("types_event", None)
         if types_event:
+            if types_event not in dict(Event.TYPE_CHOICES):
+                raise ValidationError({"types_event": "Неизвестный тип события"})
             queryset = queryset.filter(types_event=types_event)
 
-        ordering = self.request.query_params.get("ordering", "-created_at")
-        return queryset.order_by(ordering)
-    
+        if params.get("active", "").lower() == "true":
+            queryset = queryset.filter(deadline__gte=timezone.localdate())
+
+        queryset = queryset.order_by(*self.ordering_modes[self.get_ordering_mode()])
+        return queryset.with_user_views(self.request.user)
+
+    def get_ordering_mode(self):
+        params = self.request.query_params
+        ordering = params.get("ordering", None)
+        ordering = self.ordering_aliases.get(ordering, ordering)
+        if ordering not in self.ordering_modes or (
+            ordering == "relevance" and not params.get("query")
+        ):
+            ordering = "relevance" if params.get("query") else "newest"
+        return ordering
+
+    def get_validator_keys(self):
+        # Buffered clicks reorder the popular feed without touching events.
+        if self.get_ordering_mode() == "popular":
+            return [cache.CLICKS_VERSION_KEY]
+        return []
+
+    def list_page(self, request, *args, **kwargs):
+        # Pages are shared between users, only event_view is per user and
+        # is filled in from one query over the page's events.
+        if not settings.EVENTS_LIST_CACHE_TIMEOUT:
+            return super().list_page(request, *args, **kwargs)
+
+        data = cache.get_list_page(request, request.user)
+        if data is not None:
+            return Response(data)
+
+        # Anything that fills a shared cache reads the primary, a lagging
+        # replica would store a stale page under the new list version.
+        with db_router.primary():
+            queryset = self.filter_queryset(self.get_queryset())
+            page = self.paginate_queryset(queryset)
+            if page is None:
+                return super().list_page(request, *args, **kwargs)
+
+            serializer = self.get_serializer(page, many=True)
+            response = self.get_paginated_response(serializer.data)
+        cache.set_list_page(
+            request,
+            response.data,
+            page,
+            event_view="event_view" in serializer.child.fields,
+        )
+        return response
+
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context["request"] = self.request
@@ -196,19 +464,4 @@ class UnviewedEventsCountAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        user = request.user
-
-        types = [choice[0] for choice in Event.TYPE_CHOICES]
-
-        counts = {}
-
-        for t in types:
-            events_of_type = Event.objects.filter(types_event=t)
-
-            viewed_for_type = EventView.objects.filter(user=user, event__types_event=t, is_viewed=True).values_list("event_id", flat=True)
-
-            unviewed_count = events_of_type.exclude(event_id__in=viewed_for_type).count()
-
-            counts[t] = unviewed_count
-
-        return Response(counts)
\ No newline at end of file
+        return Response(counters.get_unviewed_counts(request.user))
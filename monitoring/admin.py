@@ -0,0 +1,109 @@
+import io
+import pstats
+
+from django.contrib import admin
+from django.http import FileResponse, Http404
+from django.shortcuts import get_object_or_404
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils.html import format_html
+
+from monitoring.models import RequestProfile
+
+STATS_SORT_KEYS = ("cumulative", "tottime", "ncalls")
+STATS_LIMIT = 100
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = (
+        "created_at",
+        "method",
+        "path",
+        "view_name",
+        "status_code",
+        "duration",
+        "query_count",
+        "trigger",
+        "profile_links",
+    )
+    list_filter = ("trigger", "method", "view_name")
+    search_fields = ("path",)
+    readonly_fields = (
+        "method",
+        "path",
+        "view_name",
+        "status_code",
+        "duration",
+        "query_count",
+        "trigger",
+        "filename",
+        "created_at",
+        "profile_links",
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description="Profile")
+    def profile_links(self, obj):
+        return format_html(
+            '<a href="{}">stats</a> / <a href="{}">download</a>',
+            reverse("admin:monitoring_requestprofile_stats", args=[obj.pk]),
+            reverse("admin:monitoring_requestprofile_download", args=[obj.pk]),
+        )
+
+    def get_urls(self):
+        urls = [
+            path(
+                "<int:pk>/stats/",
+                self.admin_site.admin_view(self.stats_view),
+                name="monitoring_requestprofile_stats",
+            ),
+            path(
+                "<int:pk>/download/",
+                self.admin_site.admin_view(self.download_view),
+                name="monitoring_requestprofile_download",
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def get_profile(self, request, pk):
+        if not self.has_view_permission(request):
+            raise Http404
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        if not profile.file_path.exists():
+            raise Http404("Profile file is missing, it may be on another server")
+        return profile
+
+    def download_view(self, request, pk):
+        profile = self.get_profile(request, pk)
+        return FileResponse(
+            open(profile.file_path, "rb"), as_attachment=True, filename=profile.filename
+        )
+
+    def stats_view(self, request, pk):
+        profile = self.get_profile(request, pk)
+        sort = request.GET.get("sort")
+        if sort not in STATS_SORT_KEYS:
+            sort = STATS_SORT_KEYS[0]
+
+        output = io.StringIO()
+        stats = pstats.Stats(str(profile.file_path), stream=output)
+        stats.sort_stats(sort).print_stats(STATS_LIMIT)
+
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "original": profile,
+            "title": str(profile),
+            "sort": sort,
+            "sort_keys": STATS_SORT_KEYS,
+            "stats": output.getvalue(),
+        }
+        return TemplateResponse(
+            request, "admin/monitoring/requestprofile/stats.html", context
+        )
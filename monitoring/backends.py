@@ -0,0 +1,37 @@
+from django.core.mail.backends.smtp import EmailBackend
+from storages.backends.s3boto3 import S3Boto3Storage
+
+from monitoring.metrics import timed
+
+
+class TimedS3Storage(S3Boto3Storage):
+    """
+    S3Boto3Storage that reports the time of requests to S3. URLs are built
+    locally and are not timed.
+    """
+
+    def _open(self, name, mode="rb"):
+        with timed("s3"):
+            return super()._open(name, mode)
+
+    def _save(self, name, content):
+        with timed("s3"):
+            return super()._save(name, content)
+
+    def delete(self, name):
+        with timed("s3"):
+            return super().delete(name)
+
+    def exists(self, name):
+        with timed("s3"):
+            return super().exists(name)
+
+    def size(self, name):
+        with timed("s3"):
+            return super().size(name)
+
+
+class TimedEmailBackend(EmailBackend):
+    def send_messages(self, email_messages):
+        with timed("smtp"):
+            return super().send_messages(email_messages)
@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from monitoring.profiling import PROFILE_HEADER, make_profile_token
+
+
+class Command(BaseCommand):
+    help = "Print a header that makes requests get profiled"
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{PROFILE_HEADER}: {make_profile_token()}")
+        self.stderr.write(
+            f"Valid for {settings.PROFILING_TOKEN_MAX_AGE} seconds, profiles "
+            f"show up under Monitoring > Request profiles in the admin"
+        )
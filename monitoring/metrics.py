@@ -0,0 +1,212 @@
+import logging
+import re
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+from config.redis import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+METRICS_KEY = "monitoring:metrics"
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+# name: (type, help)
+METRICS = {
+    "http_requests_total": ("counter", "Requests by view, method and status."),
+    "http_request_duration_seconds": ("histogram", "Time spent in a request."),
+    "http_request_db_queries": ("histogram", "SQL queries per request."),
+    "http_request_db_duration_seconds": ("histogram", "SQL time per request."),
+    "cache_requests_total": ("counter", "Cache lookups by cache and result."),
+    "external_call_duration_seconds": (
+        "histogram",
+        "Calls to FCM, S3 and SMTP, in and outside of requests.",
+    ),
+}
+SAMPLE_RE = re.compile(r"^(\w+?)(_bucket|_sum|_count)?\{(.*)\}$")
+
+# The metrics of the request being handled, if any.
+current = ContextVar("request_metrics", default=None)
+
+
+def format_labels(labels):
+    def escape(value):
+        return str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+    return ",".join(f'{name}="{escape(value)}"' for name, value in labels.items())
+
+
+class Registry:
+    """
+    Counters and histograms of this process, as Prometheus samples. They
+    are added to a hash in Redis every METRICS_FLUSH_SECONDS so that
+    /metrics can report all workers; without Redis it reports its own.
+    """
+
+    def __init__(self):
+        self.samples = defaultdict(float)
+        self.lock = threading.Lock()
+        self.flushed_at = time.monotonic()
+
+    def inc(self, name, labels, amount=1):
+        with self.lock:
+            self.samples[f"{name}{{{format_labels(labels)}}}"] += amount
+
+    def observe(self, name, labels, value, buckets=DURATION_BUCKETS):
+        labels = format_labels(labels)
+        separator = "," if labels else ""
+        with self.lock:
+            # Every bucket is written, even at 0, or quantiles come out wrong.
+            for bound in buckets:
+                key = f'{name}_bucket{{{labels}{separator}le="{bound}"}}'
+                self.samples[key] += value <= bound
+            self.samples[f'{name}_bucket{{{labels}{separator}le="+Inf"}}'] += 1
+            self.samples[f"{name}_sum{{{labels}}}"] += value
+            self.samples[f"{name}_count{{{labels}}}"] += 1
+
+    def flush_due(self):
+        return time.monotonic() - self.flushed_at >= settings.METRICS_FLUSH_SECONDS
+
+    def maybe_flush(self):
+        if self.flush_due():
+            self.flush()
+
+    def flush(self):
+        client = get_redis_client()
+        if client is None:
+            return
+
+        with self.lock:
+            samples, self.samples = self.samples, defaultdict(float)
+            self.flushed_at = time.monotonic()
+        if not samples:
+            return
+        try:
+            pipe = client.pipeline(transaction=False)
+            for key, value in samples.items():
+                pipe.hincrbyfloat(METRICS_KEY, key, value)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to flush metrics: {str(e)}")
+            with self.lock:
+                for key, value in samples.items():
+                    self.samples[key] += value
+
+    def collect(self):
+        client = get_redis_client()
+        if client is None:
+            with self.lock:
+                return dict(self.samples)
+
+        self.flush()
+        return {
+            key.decode(): float(value)
+            for key, value in client.hgetall(METRICS_KEY).items()
+        }
+
+    def render(self):
+        families = defaultdict(list)
+        for key, value in self.collect().items():
+            match = SAMPLE_RE.match(key)
+            if match is not None and match.group(1) in METRICS:
+                families[match.group(1)].append((key, value))
+
+        lines = []
+        for name, (metric_type, help_text) in METRICS.items():
+            if name not in families:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for key, value in sorted(families[name], key=sample_order):
+                lines.append(f"{key} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+def sample_order(sample):
+    # Buckets of a series go together and in increasing order of `le`.
+    match = SAMPLE_RE.match(sample[0])
+    labels = match.group(3)
+    le = re.search(r'(?:^|,)le="([^"]*)"$', labels)
+    if le is None:
+        return labels, match.group(2) or "", 0
+    return labels[: le.start()], "_bucket", float(le.group(1))
+
+
+registry = Registry()
+
+
+class RequestMetrics:
+    """
+    What a single request spent its time on, for the Server-Timing header.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.db_duration = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.external = defaultdict(float)
+
+    def server_timing(self, duration):
+        entries = [
+            f'db;dur={self.db_duration * 1000:.1f};desc="{self.queries} queries"',
+            f'cache;desc="{self.cache_hits} hits, {self.cache_misses} misses"',
+        ]
+        entries.extend(
+            f"{service};dur={elapsed * 1000:.1f}"
+            for service, elapsed in self.external.items()
+        )
+        entries.append(f"total;dur={duration * 1000:.1f}")
+        return ", ".join(entries)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Execute wrapper installed on every connection (see monitoring.signals).
+    It finds the request through `current`, which also reaches the threads
+    that run the synchronous parts of async views.
+    """
+    request_metrics = current.get()
+    if request_metrics is None:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        request_metrics.queries += 1
+        request_metrics.db_duration += time.perf_counter() - start
+
+
+@contextmanager
+def timed(service):
+    """
+    Time a call to another service, e.g. `with timed("s3"): ...`.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        registry.observe("external_call_duration_seconds", {"service": service}, elapsed)
+        request_metrics = current.get()
+        if request_metrics is not None:
+            request_metrics.external[service] += elapsed
+
+
+def cache_lookup(cache, hit):
+    registry.inc(
+        "cache_requests_total", {"cache": cache, "result": "hit" if hit else "miss"}
+    )
+    request_metrics = current.get()
+    if request_metrics is not None:
+        if hit:
+            request_metrics.cache_hits += 1
+        else:
+            request_metrics.cache_misses += 1
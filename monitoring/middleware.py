@@ -0,0 +1,79 @@
+import time
+
+import sentry_sdk
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+
+from monitoring import metrics
+
+
+class MetricsMiddleware:
+    """
+    Records per view how long requests take and how much of it is SQL,
+    cache and other services, and reports it in a Server-Timing header.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        request_metrics = metrics.RequestMetrics()
+        token = metrics.current.set(request_metrics)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.current.reset(token)
+        self.record(request, response, request_metrics, time.perf_counter() - start)
+        metrics.registry.maybe_flush()
+        return response
+
+    async def __acall__(self, request):
+        request_metrics = metrics.RequestMetrics()
+        token = metrics.current.set(request_metrics)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.current.reset(token)
+        self.record(request, response, request_metrics, time.perf_counter() - start)
+        # Only the flush talks to Redis, it must not block the event loop.
+        if metrics.registry.flush_due():
+            await sync_to_async(metrics.registry.flush)()
+        return response
+
+    def record(self, request, response, request_metrics, duration):
+        match = request.resolver_match
+        view = match.view_name if match is not None else "unmatched"
+        labels = {"view": view, "method": request.method}
+        registry = metrics.registry
+        registry.inc(
+            "http_requests_total", {**labels, "status": response.status_code}
+        )
+        registry.observe("http_request_duration_seconds", labels, duration)
+        registry.observe(
+            "http_request_db_queries",
+            labels,
+            request_metrics.queries,
+            metrics.COUNT_BUCKETS,
+        )
+        registry.observe(
+            "http_request_db_duration_seconds", labels, request_metrics.db_duration
+        )
+
+        span = sentry_sdk.get_current_span()
+        if span is not None:
+            span.set_data("db.query_count", request_metrics.queries)
+            span.set_data("cache.hits", request_metrics.cache_hits)
+            span.set_data("cache.misses", request_metrics.cache_misses)
+
+        if settings.METRICS_SERVER_TIMING:
+            response["Server-Timing"] = request_metrics.server_timing(duration)
@@ -0,0 +1,33 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.db import models
+
+
+class RequestProfile(models.Model):
+    TRIGGER_CHOICES = [
+        ("header", "Header"),
+        ("sample", "Sample"),
+    ]
+
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=2000)
+    view_name = models.CharField(max_length=200, blank=True)
+    status_code = models.PositiveSmallIntegerField()
+    duration = models.FloatField(help_text="ms")
+    query_count = models.PositiveIntegerField(default=0)
+    trigger = models.CharField(max_length=10, choices=TRIGGER_CHOICES)
+    filename = models.CharField(max_length=100, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration:.0f} ms)"
+
+    @property
+    def file_path(self):
+        return Path(settings.PROFILING_DIR) / self.filename
+
+    class Meta:
+        verbose_name = "Request profile"
+        verbose_name_plural = "Request profiles"
+        ordering = ("-created_at",)
@@ -0,0 +1,137 @@
+import cProfile
+import logging
+import random
+import time
+import uuid
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core import signing
+
+from monitoring import metrics
+from monitoring.models import RequestProfile
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_SALT = "monitoring.profile"
+
+
+def make_profile_token():
+    return signing.TimestampSigner(salt=PROFILE_SALT).sign(uuid.uuid4().hex)
+
+
+def is_valid_profile_token(value):
+    try:
+        signing.TimestampSigner(salt=PROFILE_SALT).unsign(
+            value, max_age=settings.PROFILING_TOKEN_MAX_AGE
+        )
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def save_profile(request, response, profiler, duration, trigger):
+    directory = Path(settings.PROFILING_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    filename = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.prof"
+    profiler.dump_stats(directory / filename)
+
+    request_metrics = metrics.current.get()
+    match = request.resolver_match
+    RequestProfile.objects.create(
+        method=request.method,
+        path=request.get_full_path()[:2000],
+        view_name=match.view_name if match is not None else "",
+        status_code=response.status_code,
+        duration=duration * 1000,
+        query_count=request_metrics.queries if request_metrics is not None else 0,
+        trigger=trigger,
+        filename=filename,
+    )
+    rotate_profiles()
+
+
+def rotate_profiles():
+    stale = RequestProfile.objects.all()[settings.PROFILING_MAX_PROFILES :]
+    # One by one, so that post_delete removes their files as well.
+    for profile in stale:
+        profile.delete()
+
+
+class ProfilingMiddleware:
+    """
+    Profiles a request with cProfile when it carries a valid X-Profile
+    header (see `manage.py profile_token`) or is picked at
+    PROFILING_SAMPLE_RATE. Other requests only pay for the header lookup.
+    Under ASGI the profile covers the event loop thread, the synchronous
+    parts run by sync_to_async show up as time spent awaiting them.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        trigger = self.get_trigger(request)
+        if trigger is None:
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another request in this process is already being profiled.
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        self.save(request, response, profiler, time.perf_counter() - start, trigger)
+        return response
+
+    async def __acall__(self, request):
+        trigger = self.get_trigger(request)
+        if trigger is None:
+            return await self.get_response(request)
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            return await self.get_response(request)
+
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            profiler.disable()
+        await sync_to_async(self.save)(
+            request, response, profiler, time.perf_counter() - start, trigger
+        )
+        return response
+
+    def save(self, request, response, profiler, duration, trigger):
+        try:
+            save_profile(request, response, profiler, duration, trigger)
+        except Exception as e:
+            logger.warning(f"Failed to save profile of {request.path}: {str(e)}")
+
+    def get_trigger(self, request):
+        token = request.headers.get(PROFILE_HEADER)
+        if token is not None and is_valid_profile_token(token):
+            return "header"
+        rate = settings.PROFILING_SAMPLE_RATE
+        if rate and random.random() < rate:
+            return "sample"
+        return None
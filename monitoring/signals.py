@@ -0,0 +1,25 @@
+import logging
+
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from monitoring import metrics
+from monitoring.models import RequestProfile
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_delete, sender=RequestProfile)
+def delete_profile_file(sender, instance, **kwargs):
+    try:
+        instance.file_path.unlink(missing_ok=True)
+    except OSError as e:
+        logger.warning(f"Failed to delete profile {instance.filename}: {str(e)}")
+
+
+@receiver(connection_created)
+def install_query_wrapper(sender, connection, **kwargs):
+    # Reconnecting reuses the same wrapper object, add it only once.
+    if metrics.record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(metrics.record_query)
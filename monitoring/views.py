@@ -0,0 +1,21 @@
+import hmac
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+
+from monitoring.metrics import registry
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint. Only answers with the METRICS_TOKEN bearer
+    token and pretends not to exist otherwise.
+    """
+    token = settings.METRICS_TOKEN
+    authorization = request.headers.get("Authorization", "")
+    if not token or not hmac.compare_digest(authorization, f"Bearer {token}"):
+        raise Http404
+
+    return HttpResponse(
+        registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -0,0 +1,116 @@
+import uuid
+
+from dj_rest_auth.jwt_auth import JWTCookieAuthentication
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from config import db_router
+from config.local_cache import LocalCache
+from monitoring.metrics import cache_lookup
+
+USER_KEY = "users:auth:{user_id}"
+USER_GENERATION_KEY = "users:auth:{user_id}:generation"
+# What the event views read from request.user, in model field order as
+# Model.from_db() expects. The other fields are deferred and loaded together
+# on first access. The password hash is left out; with CHECK_REVOKE_TOKEN
+# only the digest the token is checked against is cached next to them.
+USER_FIELDS = ("id", "type", "is_active", "created_at")
+
+User = get_user_model()
+
+local_users = LocalCache(
+    settings.USER_CACHE_LOCAL_SIZE, settings.USER_CACHE_LOCAL_TIMEOUT
+)
+
+
+def get_cached_user(user_id):
+    key = USER_KEY.format(user_id=user_id)
+    values = local_users.get(key)
+    cache_lookup("user_local", values is not None)
+    if values is None and settings.USER_CACHE_TIMEOUT:
+        values = cache.get(key)
+        cache_lookup("user", values is not None)
+        if values is not None:
+            local_users.set(key, values)
+    if values is None:
+        return None
+    *values, password_digest = values
+    user = User.from_db(db_router.PRIMARY, USER_FIELDS, values)
+    user._password_digest = password_digest
+    return user
+
+
+def get_user_generation(user_id):
+    return cache.get(USER_GENERATION_KEY.format(user_id=user_id))
+
+
+def set_cached_user(user, generation):
+    """
+    Cache `user` unless it changed since `generation` was read, which
+    means the copy may predate a deactivation or password change.
+    """
+    if get_user_generation(user.pk) != generation:
+        return
+
+    key = USER_KEY.format(user_id=user.pk)
+    password_digest = None
+    if api_settings.CHECK_REVOKE_TOKEN:
+        password_digest = get_md5_hash_password(user.password)
+    values = (*(getattr(user, field) for field in USER_FIELDS), password_digest)
+    local_users.set(key, values)
+    if settings.USER_CACHE_TIMEOUT:
+        cache.set(key, values, settings.USER_CACHE_TIMEOUT)
+
+
+def user_changed(user_id):
+    # Other processes drop their copy when its local TTL runs out. The new
+    # generation only has to outlive fills that started before it.
+    key = USER_KEY.format(user_id=user_id)
+    cache.set(
+        USER_GENERATION_KEY.format(user_id=user_id),
+        uuid.uuid4().hex,
+        max(settings.USER_CACHE_TIMEOUT, 60),
+    )
+    local_users.delete(key)
+    cache.delete(key)
+
+
+class CachedJWTCookieAuthentication(JWTCookieAuthentication):
+    """
+    JWTCookieAuthentication that resolves the token's user from a short-TTL
+    cache, per process and optionally shared, instead of the database.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        user = get_cached_user(user_id) if user_id is not None else None
+        if user is None:
+            generation = get_user_generation(user_id)
+            # A user who just signed up may not be on the replica yet.
+            with db_router.primary():
+                user = super().get_user(validated_token)
+            set_cached_user(user, generation)
+            db_router.apply_user_pin(user.pk)
+            return user
+
+        # The same checks JWTAuthentication makes on a freshly loaded user.
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # Cached before the setting was turned on: the hash is loaded.
+            password_digest = user._password_digest or get_md5_hash_password(
+                user.password
+            )
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != password_digest:
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+
+        db_router.apply_user_pin(user.pk)
+        return user
@@ -16,13 +16,6 @@ class UserManager(BaseUserManager):
         user = self.model(email=email, **extra_fields)
         user.set_password(password)
         user.save(using=self._db)
-
-        from events.models import Event, EventView
-
-        events = Event.objects.all()
-        EventView.objects.bulk_create(
-            [EventView(user=user, event=event, is_viewed=True) for event in events]
-        )
         return user
 
     def create_superuser(self, email, password=None, **extra_fields):
@@ -62,6 +55,15 @@ class User(AbstractBaseUser, PermissionsMixin):
     def __str__(self):
         return self.email
 
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        # The authentication cache restores users with most fields deferred,
+        # load all of them on first access instead of one query per field.
+        if fields is not None:
+            deferred = self.get_deferred_fields()
+            if deferred.intersection(fields):
+                fields = deferred.union(fields)
+        super().refresh_from_db(using, fields, from_queryset)
+
 
 class PasswordReset(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
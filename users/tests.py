@@ -0,0 +1,90 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users import authentication
+from users.authentication import CachedJWTCookieAuthentication
+from users.models import User
+
+
+@override_settings(USER_CACHE_TIMEOUT=300)
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        authentication.local_users.clear()
+        self.user = User.objects.create_user(
+            email="user@example.com", password="x", full_name="User", type="student"
+        )
+        self.auth = CachedJWTCookieAuthentication()
+
+    def authenticate(self, user=None):
+        token = AccessToken.for_user(user or self.user)
+        return self.auth.get_user(self.auth.get_validated_token(str(token)))
+
+    def test_cached_user_needs_no_query(self):
+        self.authenticate()
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+        self.assertEqual((user.pk, user.type), (self.user.pk, "student"))
+
+        # Everything else comes from one query on first access.
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, "user@example.com")
+            self.assertEqual(user.full_name, "User")
+
+    def test_only_auth_fields_are_cached(self):
+        self.authenticate()
+        key = authentication.USER_KEY.format(user_id=self.user.pk)
+        values = cache.get(key)
+        self.assertEqual(len(values), len(authentication.USER_FIELDS) + 1)
+        self.assertNotIn(self.user.email, values)
+        self.assertNotIn(self.user.password, values)
+        self.assertIsNone(values[-1])
+
+    def test_revoked_token(self):
+        # simplejwt's modules keep the api_settings they imported, so it is
+        # patched instead of overriding SIMPLE_JWT.
+        with mock.patch.object(
+            authentication.api_settings, "CHECK_REVOKE_TOKEN", True
+        ):
+            token = str(AccessToken.for_user(self.user))
+            self.auth.get_user(self.auth.get_validated_token(token))
+            with self.assertNumQueries(0):
+                self.auth.get_user(self.auth.get_validated_token(token))
+
+            self.user.set_password("y")
+            with self.captureOnCommitCallbacks(execute=True):
+                self.user.save()
+            with self.assertRaises(AuthenticationFailed):
+                self.auth.get_user(self.auth.get_validated_token(token))
+
+    def test_deactivation_invalidates(self):
+        self.authenticate()
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_change_during_fill_is_not_cached(self):
+        get_user = JWTAuthentication.get_user
+
+        def load_then_deactivate(auth, validated_token):
+            user = get_user(auth, validated_token)
+            # The admin deactivates the user while the request still holds
+            # the copy it loaded.
+            User.objects.filter(pk=user.pk).update(is_active=False)
+            authentication.user_changed(user.pk)
+            return user
+
+        with mock.patch.object(JWTAuthentication, "get_user", load_then_deactivate):
+            self.authenticate()
+
+        self.assertIsNone(authentication.get_cached_user(self.user.pk))
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()